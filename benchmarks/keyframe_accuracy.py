@@ -0,0 +1,124 @@
+import argparse
+import json
+import os
+import time
+import cv2
+import numpy as np
+from camera_library.camera_display import landmarks_to_array
+from camera_library.frame_sources import VideoFileSource
+from camera_library.keyframe_tracker import KeyframeTracker
+from camera_library.recognition_main_loop import FrameTimestamper, create_gesture_recognizer, to_mp_image
+from function_library.math_functions import calculate_pointer_angle
+from hand_recognition.manual_hand_recognition import finger_features
+
+
+def hand_labels(result):
+    return [handedness[0].category_name if handedness else "Unknown" for handedness in result.handedness]
+
+
+def evaluate(path, interval, max_frames=None):
+    # The model runs on every frame as the reference. The tracker sees the model output only on
+    # the frames where keyframe mode would have run the model itself.
+    source = VideoFileSource(path, realtime=False)
+    recognizer = create_gesture_recognizer()
+    timestamps = FrameTimestamper()
+    tracker = KeyframeTracker(interval=interval)
+
+    pixel_errors = []
+    angle_errors = []
+    finger_matches = []
+    inference_times = []
+    tracking_times = []
+    model_frames = 0
+    frames = 0
+    try:
+        while max_frames is None or frames < max_frames:
+            ret, frame = source.read()
+            if not ret:
+                break
+            frames += 1
+            h, w = frame.shape[:2]
+
+            inference_start = time.perf_counter()
+            reference = recognizer.recognize_for_video(to_mp_image(frame), timestamps.next_ms(source.frame_time))
+            inference_times.append(time.perf_counter() - inference_start)
+
+            tracking_start = time.perf_counter()
+            tracked = tracker.track(frame)
+            if tracked is None:
+                tracker.keyframe(frame, reference)
+                model_frames += 1
+                continue
+            tracking_times.append(time.perf_counter() - tracking_start)
+
+            reference_hands = landmarks_to_array(reference.hand_landmarks)
+            if hand_labels(reference) != hand_labels(tracked):
+                # A hand appeared or left between keyframes, every landmark of it counts as lost.
+                finger_matches.append(0.0)
+                continue
+            tracked_hands = tracked.landmark_array
+            scale = np.array([w, h], dtype=np.float32)
+            errors = np.linalg.norm((tracked_hands[:, :, :2] - reference_hands[:, :, :2]) * scale, axis=2)
+            pixel_errors.extend(errors.ravel().tolist())
+
+            tracked_open, _ = finger_features(tracked_hands)
+            reference_open, _ = finger_features(reference_hands)
+            finger_matches.append(float(np.mean(tracked_open == reference_open)))
+            angle_delta = np.abs(calculate_pointer_angle(tracked_hands) - calculate_pointer_angle(reference_hands))
+            angle_errors.extend(np.minimum(angle_delta, 360.0 - angle_delta).ravel().tolist())
+    finally:
+        recognizer.close()
+        source.release()
+
+    def percentiles(values):
+        if not values:
+            return None
+        p50, p95 = np.percentile(values, [50, 95])
+        return {"mean": float(np.mean(values)), "p50": float(p50), "p95": float(p95)}
+
+    inference_ms = 1000.0 * float(np.mean(inference_times)) if inference_times else 0.0
+    tracking_ms = 1000.0 * float(np.mean(tracking_times)) if tracking_times else 0.0
+    tracked_frames = frames - model_frames
+    return {
+        "interval": interval,
+        "frames": frames,
+        "model_frames": model_frames,
+        "tracked_frames": tracked_frames,
+        "tracking_failures": tracker.tracking_failures,
+        "inference_ms": inference_ms,
+        "tracking_ms": tracking_ms,
+        # Estimated cost relative to running the model on every frame.
+        "relative_cost": (model_frames * inference_ms + tracked_frames * tracking_ms) / (frames * inference_ms) if frames and inference_ms else None,
+        "landmark_error_px": percentiles(pixel_errors),
+        "pointer_angle_error_deg": percentiles(angle_errors),
+        "finger_state_agreement": float(np.mean(finger_matches)) if finger_matches else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure keyframe tracking accuracy against the model on a recorded video.")
+    parser.add_argument("video", help="video file or image directory, e.g. a debug segment saved with Save Debug Clip")
+    parser.add_argument("--intervals", nargs="+", type=int, default=[2, 3, 4, 6])
+    parser.add_argument("--frames", type=int, default=None)
+    parser.add_argument("--output", default="keyframe_results.json")
+    args = parser.parse_args()
+
+    report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "input": args.video, "opencv": cv2.__version__, "runs": []}
+    for interval in args.intervals:
+        entry = evaluate(args.video, interval, args.frames)
+        report["runs"].append(entry)
+        error = entry["landmark_error_px"] or {}
+        print(
+            f"N={interval}: model on {entry['model_frames']}/{entry['frames']} frames, "
+            f"relative cost {entry['relative_cost'] or 0:.2f}, "
+            f"landmark error p50 {error.get('p50', 0):.1f}px p95 {error.get('p95', 0):.1f}px, "
+            f"finger agreement {entry['finger_state_agreement'] or 0:.3f}"
+        )
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    print(f"Results written to {os.path.abspath(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import argparse
+import json
+import os
+import platform
+import time
+import cv2
+import numpy as np
+from configuration.configuration import cfg
+from camera_library.camera_display import HandOverlay, get_labels, landmarks_to_array
+from camera_library.frame_sources import SyntheticSource, VideoFileSource
+from camera_library.hand_croper import HandCropper
+from camera_library.recognition_main_loop import FrameTimestamper, create_gesture_recognizer, to_mp_image
+from configuration.function_assigne.function_configuration import resolve_func_name, select_and_call_func
+from hand_recognition.hand_processing import process_hands, DryRunActuator, live_actuator
+from hand_recognition.gesture_state import GestureTracker
+from hand_recognition.landmark_recording import LandmarkRecording, ReplayCategory, ReplayResult
+from hand_recognition.manual_hand_recognition import detect_finger_gestures
+
+try:
+    from PyQt6.QtGui import QImage
+except ImportError:
+    QImage = None
+
+DEFAULT_RESOLUTIONS = ["640x480", "1280x720", "1920x1080"]
+
+# Index finger extended, the other fingers folded: detected as "pointer" after debouncing.
+POINTER_HAND = np.array([
+    (0.50, 0.80, 0.0), (0.45, 0.75, 0.0), (0.42, 0.70, 0.0), (0.41, 0.66, 0.0), (0.42, 0.63, 0.0),
+    (0.48, 0.60, 0.0), (0.48, 0.52, 0.0), (0.48, 0.46, 0.0), (0.48, 0.40, 0.0),
+    (0.51, 0.60, 0.0), (0.52, 0.56, 0.0), (0.52, 0.60, 0.0), (0.51, 0.63, 0.0),
+    (0.54, 0.61, 0.0), (0.55, 0.58, 0.0), (0.55, 0.62, 0.0), (0.54, 0.64, 0.0),
+    (0.57, 0.63, 0.0), (0.58, 0.61, 0.0), (0.58, 0.64, 0.0), (0.57, 0.66, 0.0),
+], dtype=np.float32)
+
+
+def synthetic_results():
+    hands = np.stack([POINTER_HAND - (0.2, 0.0, 0.0), POINTER_HAND + (0.2, 0.0, 0.0)]).astype(np.float32)
+    gestures = [[ReplayCategory("Pointing_Up", 0.9)], [ReplayCategory("Pointing_Up", 0.9)]]
+    handedness = [[ReplayCategory("Left", 1.0)], [ReplayCategory("Right", 1.0)]]
+    return [ReplayResult(gestures, handedness, hands)]
+
+
+def recording_results(path):
+    recording = LandmarkRecording(path)
+    return [recording.result(i) for i in range(len(recording)) if recording.hand_slice(i).stop > recording.hand_slice(i).start]
+
+
+def summarize(samples):
+    values = np.asarray(samples, dtype=np.float64) * 1000.0
+    if values.size == 0:
+        return None
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": int(values.size),
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+    }
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples = {}
+
+    def time(self, stage, func, *args):
+        start = time.perf_counter()
+        value = func(*args)
+        self.samples.setdefault(stage, []).append(time.perf_counter() - start)
+        return value
+
+
+def to_preview_image(frame):
+    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    if QImage is None:
+        return rgb_frame
+    h, w, ch = rgb_frame.shape
+    return QImage(rgb_frame.data, w, h, ch * w, QImage.Format.Format_RGB888).copy()
+
+
+def run_resolution(width, height, frames, results, recognizer, timestamps, video_path=None, actuate=False):
+    if video_path:
+        source = VideoFileSource(video_path, realtime=False)
+    else:
+        source = SyntheticSource(width, height, realtime=False, frame_count=frames)
+    cropper = HandCropper(
+        output_width=min(cfg.camera_width_crop, width),
+        output_height=min(cfg.camera_height_crop, height),
+        smoothing_factor=0.1,
+    )
+    timer = StageTimer()
+    # Without --actuate the actions are only collected, process_hands is timed either way.
+    actuator = live_actuator if actuate else DryRunActuator()
+    tracker = GestureTracker()
+    processed = 0
+    loop_start = time.perf_counter()
+
+    for i in range(frames):
+        ret, frame = source.read()
+        if not ret:
+            break
+        if video_path:
+            frame = cv2.resize(frame, (width, height))
+        frame_start = time.perf_counter()
+
+        config = timer.time("begin_frame", cfg.begin_frame)
+        mp_image = timer.time("to_mp_image", to_mp_image, frame)
+        if recognizer is not None:
+            timer.time("recognize_for_video", recognizer.recognize_for_video, mp_image, timestamps.next_ms())
+
+        result = results[i % len(results)]
+        hand_labels = [handedness[0].category_name for handedness in result.handedness]
+        hands = timer.time("landmarks_to_array", landmarks_to_array, result.hand_landmarks)
+        finger_gestures = timer.time("detect_finger_gesture", detect_finger_gestures, hands, hand_labels, None, None, config)
+
+        dispatch = select_and_call_func if actuate else resolve_func_name
+        dispatch_start = time.perf_counter()
+        for gestures, hand_label, (finger_gesture_text, _) in zip(result.gestures, hand_labels, finger_gestures):
+            dispatch(gestures[0] if gestures else None, hand_label, finger_gesture_text, config)
+        timer.samples.setdefault("select_and_call_func", []).append(time.perf_counter() - dispatch_start)
+
+        timer.time("process_hands", process_hands, frame.copy(), result, tracker, config, None, actuator)
+        if not actuate:
+            actuator.take()
+
+        overlay = HandOverlay(hands, hand_labels)
+        for gestures, hand_label, (finger_gesture_text, _) in zip(result.gestures, hand_labels, finger_gestures):
+            top_gesture_text = f"{gestures[0].category_name} {gestures[0].score:.2f}" if gestures else ""
+            overlay.left_text, overlay.right_text = get_labels(top_gesture_text, hand_label, finger_gesture_text, overlay.left_text, overlay.right_text)
+
+        cropped_frame, origin = timer.time("hand_cropper_crop", cropper.crop, frame, hands)
+        timer.time("draw_overlay", overlay.draw, cropped_frame, (frame.shape[1], frame.shape[0]), origin)
+        timer.time("preview_conversion", to_preview_image, cropped_frame)
+
+        timer.samples.setdefault("frame_total", []).append(time.perf_counter() - frame_start)
+        processed += 1
+
+    elapsed = time.perf_counter() - loop_start
+    source.release()
+    return {
+        "width": width,
+        "height": height,
+        "frames": processed,
+        "fps": processed / elapsed if elapsed > 0 else 0.0,
+        "stages": {stage: summarize(samples) for stage, samples in timer.samples.items()},
+    }
+
+
+def parse_resolution(value):
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time every stage of the recognition pipeline.")
+    parser.add_argument("--resolutions", nargs="+", default=DEFAULT_RESOLUTIONS, help="capture sizes as WIDTHxHEIGHT")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--video", help="video file or image directory with hands, used instead of synthetic frames")
+    parser.add_argument("--recording", help="landmark recording used as post-processing input")
+    parser.add_argument("--no-model", action="store_true", help="skip the MediaPipe recognizer stage")
+    parser.add_argument("--actuate", action="store_true", help="really fire assigned actions instead of a dry run")
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    results = recording_results(args.recording) if args.recording else synthetic_results()
+    if not results:
+        print(f"No frames with hands in {args.recording}.")
+        return
+
+    recognizer = None
+    if not args.no_model:
+        try:
+            recognizer = create_gesture_recognizer()
+        except Exception as e:
+            print(f"Recognizer unavailable, skipping inference stage: {e}")
+    if recognizer is not None and not args.video:
+        # The recognizer is much cheaper on a frame without a hand, pass a recorded video for real numbers.
+        print("Inference runs on synthetic frames without hands, use --video for representative timings.")
+    timestamps = FrameTimestamper()
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "input": args.video or "synthetic (no hands)",
+        "landmarks": args.recording or "synthetic",
+        "resolutions": [],
+    }
+    try:
+        for resolution in args.resolutions:
+            width, height = parse_resolution(resolution)
+            entry = run_resolution(width, height, args.frames, results, recognizer, timestamps, args.video, args.actuate)
+            report["resolutions"].append(entry)
+            print(f"{width}x{height}: {entry['frames']} frames, {entry['fps']:.1f} fps")
+            for stage, stats in entry["stages"].items():
+                if stats:
+                    print(f"  {stage:<22} p50 {stats['p50_ms']:8.3f} ms  p95 {stats['p95_ms']:8.3f} ms  p99 {stats['p99_ms']:8.3f} ms")
+    finally:
+        if recognizer is not None:
+            recognizer.close()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    print(f"Results written to {os.path.abspath(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import json
+import os
+import platform
+import threading
+import time
+import cv2
+from configuration.configuration import current_dir
+from configuration.config_persistence import write_json_atomic
+
+CAPABILITIES_FILE = os.path.join(current_dir, "camera_capabilities.json")
+PROBE_WARMUP_FRAMES = 3
+PROBE_FRAMES = 10
+PROBE_TIMEOUT = 2.5
+
+
+def fourcc_code(name):
+    return cv2.VideoWriter_fourcc(*name)
+
+
+def fourcc_name(value):
+    value = int(value or 0)
+    if value <= 0:
+        return ""
+    return value.to_bytes(4, "little").decode("ascii", errors="replace").strip("\x00 ")
+
+
+def device_key(cap, camera_index):
+    try:
+        backend = cap.getBackendName()
+    except cv2.error:
+        backend = "unknown"
+    return f"{platform.system()}:{backend}:{camera_index}"
+
+
+def _apply_mode(cap, fourcc, width, height, fps, buffer_size):
+    # FOURCC goes first, several backends only accept MJPG before the size is changed.
+    if fourcc:
+        cap.set(cv2.CAP_PROP_FOURCC, fourcc_code(fourcc))
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    if fps > 0:
+        cap.set(cv2.CAP_PROP_FPS, fps)
+    buffered = buffer_size > 0 and cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+    return {
+        "fourcc": fourcc_name(cap.get(cv2.CAP_PROP_FOURCC)) or fourcc or "",
+        "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        "fps": float(cap.get(cv2.CAP_PROP_FPS) or 0.0),
+        "buffer_size": int(cap.get(cv2.CAP_PROP_BUFFERSIZE)) if buffered else None,
+    }
+
+
+def _measure_fps(cap):
+    # The FPS property is what the driver promises, raw 1080p often only delivers a few frames a second.
+    for _ in range(PROBE_WARMUP_FRAMES):
+        if not cap.read()[0]:
+            return 0.0
+    start = time.monotonic()
+    frames = 0
+    while frames < PROBE_FRAMES and time.monotonic() - start < PROBE_TIMEOUT:
+        if not cap.read()[0]:
+            break
+        frames += 1
+    elapsed = time.monotonic() - start
+    return frames / elapsed if frames and elapsed > 0 else 0.0
+
+
+def _score(mode, width, height, fps, native):
+    size_ok = mode["width"] == width and mode["height"] == height
+    fast_enough = fps <= 0 or mode["measured_fps"] >= 0.9 * fps
+    # Uncompressed frames skip the JPEG decode, so the native format wins whenever it keeps up.
+    return size_ok, fast_enough, mode["fourcc"] == native, min(mode["measured_fps"], fps or mode["measured_fps"])
+
+
+class CapabilityCache:
+    # Probe results per device, kept on disk so only the first start with a new mode is slow.
+    def __init__(self, path=CAPABILITIES_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._data = None
+
+    def _load(self):
+        if self._data is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError):
+                self._data = {}
+        return self._data
+
+    def get(self, device, request):
+        with self._lock:
+            return self._load().get(device, {}).get("modes", {}).get(request)
+
+    def put(self, device, request, mode, probed):
+        with self._lock:
+            entry = self._load().setdefault(device, {})
+            entry.setdefault("modes", {})[request] = mode
+            formats = entry.setdefault("formats", {})
+            for result in probed:
+                formats[f"{result['fourcc']} {result['width']}x{result['height']}"] = result["measured_fps"]
+            try:
+                write_json_atomic(self.path, self._data)
+            except OSError as e:
+                print(f"Could not save camera capabilities: {e}")
+
+    def forget(self, device=None):
+        with self._lock:
+            data = self._load()
+            if device is None:
+                data.clear()
+            else:
+                data.pop(device, None)
+            try:
+                write_json_atomic(self.path, data)
+            except OSError:
+                pass
+
+
+capability_cache = CapabilityCache()
+
+
+def negotiate_mode(cap, camera_index, width, height, fps=30.0, fourcc="auto", buffer_size=1):
+    # OpenCV cannot list what a device supports, so the native format and MJPG are tried at the
+    # requested size and their real frame rate is measured. The winner is cached per device.
+    device = device_key(cap, camera_index)
+    request = f"{width}x{height}@{fps:g}/{fourcc}"
+    cached = capability_cache.get(device, request)
+    if cached is not None:
+        applied = _apply_mode(cap, cached["fourcc"], width, height, fps, buffer_size)
+        if applied["width"] == cached["width"] and applied["height"] == cached["height"]:
+            return dict(cached, buffer_size=applied["buffer_size"], cached=True)
+
+    native = fourcc_name(cap.get(cv2.CAP_PROP_FOURCC))
+    if fourcc and fourcc != "auto":
+        candidates = [fourcc]
+    else:
+        candidates = [native or "YUYV", "MJPG"]
+    probed = []
+    for candidate in dict.fromkeys(candidates):
+        applied = _apply_mode(cap, candidate, width, height, fps, buffer_size)
+        if applied["fourcc"] != candidate and len(candidates) > 1:
+            continue
+        applied["measured_fps"] = round(_measure_fps(cap), 1)
+        probed.append(applied)
+    if not probed:
+        return None
+
+    best = max(probed, key=lambda mode: _score(mode, width, height, fps, native))
+    if best is not probed[-1]:
+        _apply_mode(cap, best["fourcc"], width, height, fps, buffer_size)
+    capability_cache.put(device, request, best, probed)
+    return dict(best, cached=False)
+
+
+def describe_mode(mode):
+    text = f"{mode['width']}x{mode['height']} {mode['fourcc'] or '?'} @ {mode['fps']:g} fps"
+    if mode.get("measured_fps"):
+        text += f" (measured {mode['measured_fps']:g})"
+    if mode.get("buffer_size"):
+        text += f", buffer {mode['buffer_size']}"
+    return text
@@ -1,41 +1,160 @@
 import cv2
+import numpy as np
 import platform
+import threading
+from collections import OrderedDict
 from configuration.configuration import cfg
+from diagnostics_library.metrics import format_snapshot
 from mediapipe.framework.formats import landmark_pb2
 
 
-def create_camera_capture():
+def create_camera_capture(camera_index=None, width=None, height=None, fps=None, fourcc=None, buffer_size=None):
+    from camera_library.camera_capabilities import negotiate_mode, describe_mode
+
+    camera_index = cfg.camera_index if camera_index is None else camera_index
     if platform.system() == "Windows":
-        cap = cv2.VideoCapture(cfg.camera_index, cv2.CAP_DSHOW)
+        cap = cv2.VideoCapture(camera_index, cv2.CAP_DSHOW)
     else:
-        cap = cv2.VideoCapture(cfg.camera_index)
+        cap = cv2.VideoCapture(camera_index)
     
     if not cap.isOpened():
         print("Unable to open camera.")
-        print(f"Camera index: {cfg.camera_index}, Platform: {platform.system()}")
-        return None
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, cfg.camera_width_default)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, cfg.camera_height_default)
+        print(f"Camera index: {camera_index}, Platform: {platform.system()}")
+        return None, None
     cv2.setUseOptimized(True)
-    return cap
+    mode = negotiate_mode(
+        cap,
+        camera_index,
+        cfg.camera_width_default if width is None else width,
+        cfg.camera_height_default if height is None else height,
+        cfg.camera_fps if fps is None else fps,
+        fourcc=cfg.camera_fourcc if fourcc is None else fourcc,
+        buffer_size=cfg.camera_buffer_size if buffer_size is None else buffer_size,
+    )
+    if mode is not None:
+        print(f"Camera {camera_index}: {describe_mode(mode)}" + (" (cached)" if mode["cached"] else ""))
+    return cap, mode
+
+def landmarks_to_array(landmarks_list):
+    hands = np.full((len(landmarks_list), 21, 3), np.nan, dtype=np.float32)
+    for i, hand_lms in enumerate(landmarks_list):
+        if isinstance(hand_lms, landmark_pb2.NormalizedLandmarkList):
+            hand_lms = hand_lms.landmark
+        if len(hand_lms) != 21:
+            continue
+        hands[i] = [(lm.x, lm.y, getattr(lm, "z", 0.0) or 0.0) for lm in hand_lms]
+    return hands
+
+# MediaPipe's HAND_CONNECTIONS as six polylines, so a hand is drawn with a single cv2.polylines call.
+HAND_CHAINS = (
+    np.array([0, 1, 2, 3, 4]),
+    np.array([0, 5, 6, 7, 8]),
+    np.array([9, 10, 11, 12]),
+    np.array([13, 14, 15, 16]),
+    np.array([0, 17, 18, 19, 20]),
+    np.array([5, 9, 13, 17]),
+)
+LEFT_COLOR = (255, 0, 0)
+RIGHT_COLOR = (0, 0, 255)
+
+
+class LabelSprites:
+    # Text is rendered once into a small alpha mask and blended in afterwards, a label costs
+    # the same whatever the size of the image it is drawn on.
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        # Shared by the preview thread and the debug capture thread.
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+
+    def _sprite(self, text, color, font_scale, thickness):
+        key = (text, color, font_scale, thickness)
+        with self._lock:
+            sprite = self._cache.get(key)
+            if sprite is not None:
+                self._cache.move_to_end(key)
+                return sprite
+        (tw, th), baseline = cv2.getTextSize(text, cfg.font, font_scale, thickness)
+        mask = np.zeros((th + baseline + 2 * thickness, tw + 2 * thickness), dtype=np.uint8)
+        cv2.putText(mask, text, (thickness, th + thickness), cfg.font, font_scale, 255, thickness, cv2.LINE_AA)
+        alpha = mask[:, :, None].astype(np.float32) / 255.0
+        sprite = (1.0 - alpha, alpha * np.array(color, dtype=np.float32), th + thickness, tw)
+        with self._lock:
+            self._cache[key] = sprite
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return sprite
+
+    def width(self, text, color, font_scale, thickness):
+        # Measured once with the sprite, right-aligned labels need it every frame.
+        return self._sprite(text, color, font_scale, thickness)[3]
+
+    def draw(self, image, text, origin, color, font_scale, thickness):
+        # origin is the left end of the baseline, like for cv2.putText.
+        keep, ink, ascent, _ = self._sprite(text, color, font_scale, thickness)
+        sh, sw = keep.shape[:2]
+        x = int(origin[0]) - thickness
+        y = int(origin[1]) - ascent
+        h, w = image.shape[:2]
+        x1, y1, x2, y2 = max(x, 0), max(y, 0), min(x + sw, w), min(y + sh, h)
+        if x1 >= x2 or y1 >= y2:
+            return
+        roi = image[y1:y2, x1:x2]
+        sx, sy = x1 - x, y1 - y
+        blended = roi * keep[sy:sy + y2 - y1, sx:sx + x2 - x1] + ink[sy:sy + y2 - y1, sx:sx + x2 - x1]
+        np.copyto(roi, blended, casting="unsafe")
+
+
+label_sprites = LabelSprites()
+
+
+class HandOverlay:
+    # What process_hands wants shown for a frame. Nothing is drawn on the camera frame itself,
+    # draw() renders onto the mirrored preview crop once it has been cut out.
+    def __init__(self, hands=None, hand_labels=(), left_text=None, right_text=None):
+        # A copy, the overlay may be drawn after the filters have moved on to the next frame.
+        self.hands = None if hands is None else np.array(hands[:, :, :2])
+        self.hand_labels = list(hand_labels)
+        self.colors = [LEFT_COLOR if label == "Left" else RIGHT_COLOR for label in self.hand_labels]
+        self.left_text = left_text
+        self.right_text = right_text
 
-def to_landmark_proto(hand_lms):
-    if isinstance(hand_lms, landmark_pb2.NormalizedLandmarkList):
-        return hand_lms
-    proto = landmark_pb2.NormalizedLandmarkList()
-    for lm in hand_lms:
-        proto.landmark.add(x=lm.x, y=lm.y, z=getattr(lm, "z", 0.0))
-    return proto
+    def draw(self, image, frame_size, origin=(0, 0)):
+        # image is a crop of the mirrored frame whose top-left corner sits at origin.
+        h, w = image.shape[:2]
+        if self.hands is not None and len(self.hands):
+            frame_w, frame_h = frame_size
+            points = self.hands * (frame_w, frame_h)
+            points[:, :, 0] = frame_w - points[:, :, 0]
+            points -= origin
+            for hand, color in zip(points, self.colors):
+                if np.isnan(hand).any():
+                    continue
+                visible = (hand[:, 0] >= 0) & (hand[:, 0] < w) & (hand[:, 1] >= 0) & (hand[:, 1] < h)
+                if not visible.any():
+                    continue
+                hand = np.rint(hand).astype(np.int32)
+                cv2.polylines(image, [hand[chain] for chain in HAND_CHAINS], False, color, 2, cv2.LINE_AA)
+                for x, y in hand[visible]:
+                    cv2.circle(image, (int(x), int(y)), 3, color, -1, cv2.LINE_AA)
 
-def draw_corner_labels(frame, w, left_corner_text, right_corner_text):
-    frame = cv2.flip(frame, 1)
-    if left_corner_text:
-        cv2.putText(frame, left_corner_text, (10, 30), cfg.font, cfg.font_scale, (255, 0, 0), cfg.thickness, cv2.LINE_AA)
+        if self.left_text:
+            label_sprites.draw(image, self.left_text, (10, 30), LEFT_COLOR, cfg.font_scale, cfg.thickness)
+        if self.right_text:
+            tw = label_sprites.width(self.right_text, RIGHT_COLOR, cfg.font_scale, cfg.thickness)
+            label_sprites.draw(image, self.right_text, (w - tw - 10, 30), RIGHT_COLOR, cfg.font_scale, cfg.thickness)
+        return image
 
-    if right_corner_text:
-        (tw, _), _ = cv2.getTextSize(right_corner_text, cfg.font, cfg.font_scale, cfg.thickness)
-        cv2.putText(frame, right_corner_text, (w - tw - 10, 30), cfg.font, cfg.font_scale, (0, 0, 255), cfg.thickness, cv2.LINE_AA)
+    def render_mirrored(self, frame):
+        # Full-size mirrored view, used where a whole frame is kept (debug captures).
+        h, w = frame.shape[:2]
+        return self.draw(cv2.flip(frame, 1), (w, h))
 
+def draw_metrics_overlay(frame, snapshot):
+    lines = format_snapshot(snapshot)
+    top = frame.shape[0] - 12 - 18 * (len(lines) - 1)
+    for i, line in enumerate(lines):
+        label_sprites.draw(frame, line, (10, top + 18 * i), (0, 255, 0), 0.45, 1)
     return frame
 
 def extract_lists(recognition_result):
@@ -0,0 +1,85 @@
+import threading
+import time
+
+
+class FrameGrabber:
+    def __init__(self, cap, drop_frames=True, retry_delay=0.01):
+        self.cap = cap
+        self.drop_frames = drop_frames
+        self.retry_delay = retry_delay
+        self.running = False
+        self.captured_frames = 0
+        self.dropped_frames = 0
+        self.failed_reads = 0
+        self._thread = None
+        self._cond = threading.Condition()
+        self._frame = None
+        self._frame_time = 0.0
+        self._arrival_time = 0.0
+        self.last_arrival_time = None
+        self._frame_id = 0
+        self._consumed_id = 0
+
+    def start(self):
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name="FrameGrabber", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while self.running:
+            ret, frame = self.cap.read()
+            arrival_time = time.monotonic()
+            capture_time = getattr(self.cap, "frame_time", None)
+            if capture_time is None:
+                capture_time = arrival_time
+            if not ret:
+                if getattr(self.cap, "finished", False):
+                    break
+                self.failed_reads += 1
+                time.sleep(self.retry_delay)
+                continue
+            with self._cond:
+                if not self.drop_frames:
+                    self._cond.wait_for(lambda: self._frame_id == self._consumed_id or not self.running)
+                # The previous frame was never picked up by the consumer, it is replaced instead of queued.
+                if self._frame_id != self._consumed_id:
+                    self.dropped_frames += 1
+                self._frame = frame
+                self._frame_time = capture_time
+                self._arrival_time = arrival_time
+                self._frame_id += 1
+                self.captured_frames += 1
+                self._cond.notify_all()
+
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+
+    def read(self, timeout=1.0):
+        with self._cond:
+            self._cond.wait_for(lambda: self._frame_id != self._consumed_id or not self.running, timeout)
+            if self._frame_id == self._consumed_id:
+                return False, None, None
+            self._consumed_id = self._frame_id
+            frame = self._frame
+            self._frame = None
+            self.last_arrival_time = self._arrival_time
+            self._cond.notify_all()
+            return True, frame, self._frame_time
+
+    def stats(self):
+        with self._cond:
+            return {
+                "captured": self.captured_frames,
+                "dropped": self.dropped_frames,
+                "failed_reads": self.failed_reads,
+            }
+
+    def stop(self):
+        self.running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
@@ -0,0 +1,184 @@
+import glob
+import os
+import time
+import cv2
+import numpy as np
+from configuration.configuration import cfg
+from camera_library.camera_display import create_camera_capture
+from camera_library.resource_pool import ResourcePool
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class CameraSource:
+    realtime = True
+
+    def __init__(self, cap, mode=None):
+        self.cap = cap
+        # The negotiated capture mode, see camera_capabilities.negotiate_mode.
+        self.mode = mode
+        self.frame_time = None
+        self.finished = False
+        self.pool_key = None
+
+    def isOpened(self):
+        return self.cap is not None and self.cap.isOpened()
+
+    def read(self):
+        ret, frame = self.cap.read()
+        self.frame_time = time.monotonic()
+        return ret, frame
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class _PacedSource:
+    def __init__(self, fps, realtime):
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.realtime = realtime
+        self.frame_index = 0
+        self.frame_time = None
+        self.finished = False
+        self._start_time = None
+
+    def _next_frame_time(self):
+        # Timestamps come from the frame index so repeated runs see identical values.
+        frame_time = self.frame_index / self.fps
+        if self.realtime:
+            if self._start_time is None:
+                self._start_time = time.monotonic()
+            delay = self._start_time + frame_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        self.frame_index += 1
+        self.frame_time = frame_time
+        return frame_time
+
+    def _finish(self):
+        self.finished = True
+        return False, None
+
+
+class VideoFileSource(_PacedSource):
+    def __init__(self, path, realtime=True, fps=None):
+        self.path = path
+        self.cap = None
+        self.image_paths = None
+        if os.path.isdir(path):
+            self.image_paths = sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+        elif any(ch in path for ch in "*?["):
+            self.image_paths = sorted(glob.glob(path))
+        else:
+            self.cap = cv2.VideoCapture(path)
+            if fps is None and self.cap.isOpened():
+                fps = self.cap.get(cv2.CAP_PROP_FPS)
+        super().__init__(fps or cfg.frame_source_fps, realtime)
+
+    def isOpened(self):
+        if self.image_paths is not None:
+            return len(self.image_paths) > 0
+        return self.cap is not None and self.cap.isOpened()
+
+    def read(self):
+        if self.finished:
+            return False, None
+        if self.image_paths is not None:
+            if self.frame_index >= len(self.image_paths):
+                return self._finish()
+            frame = cv2.imread(self.image_paths[self.frame_index])
+            if frame is None:
+                return self._finish()
+        else:
+            ret, frame = self.cap.read()
+            if not ret:
+                return self._finish()
+        self._next_frame_time()
+        return True, frame
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+
+
+class SyntheticSource(_PacedSource):
+    def __init__(self, width, height, fps=30.0, frame_count=None, realtime=True):
+        super().__init__(fps, realtime)
+        self.width = width
+        self.height = height
+        self.frame_count = frame_count
+        self._background = np.zeros((height, width, 3), dtype=np.uint8)
+        self._background[:] = (40, 40, 40)
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        if self.frame_count is not None and self.frame_index >= self.frame_count:
+            return self._finish()
+        frame = self._background.copy()
+        phase = self.frame_index / self.fps
+        cx = int(self.width * (0.5 + 0.3 * np.sin(phase)))
+        cy = int(self.height * (0.5 + 0.3 * np.cos(phase * 0.7)))
+        radius = max(8, min(self.width, self.height) // 10)
+        cv2.circle(frame, (cx, cy), radius, (120, 170, 220), -1)
+        self._next_frame_time()
+        return True, frame
+
+    def release(self):
+        pass
+
+
+def camera_key(camera_index=None):
+    # Every setting the capture is opened with, a pooled camera is only reused when all match.
+    camera_index = cfg.camera_index if camera_index is None else camera_index
+    return (
+        camera_index, cfg.camera_width_default, cfg.camera_height_default,
+        cfg.camera_fps, cfg.camera_fourcc, cfg.camera_buffer_size,
+    )
+
+
+def _open_camera(key):
+    cap, mode = create_camera_capture(*key)
+    return CameraSource(cap, mode) if cap is not None else None
+
+
+# A stopped camera stays open for camera_idle_timeout seconds so a quick restart is instant.
+camera_pool = ResourcePool("camera", _open_camera, CameraSource.release, idle_timeout=lambda: cfg.camera_idle_timeout)
+
+
+def release_frame_source(source):
+    if isinstance(source, CameraSource) and source.pool_key is not None:
+        camera_pool.release(source.pool_key, source)
+    else:
+        source.release()
+
+
+def create_frame_source(camera_index=None):
+    kind = cfg.frame_source
+    if kind == "video":
+        source = VideoFileSource(cfg.frame_source_path, realtime=cfg.frame_source_realtime)
+    elif kind == "synthetic":
+        source = SyntheticSource(
+            cfg.camera_width_default,
+            cfg.camera_height_default,
+            fps=cfg.frame_source_fps,
+            realtime=cfg.frame_source_realtime,
+        )
+    else:
+        key = camera_key(camera_index)
+        source = camera_pool.acquire(key)
+        if source is None:
+            return None
+        source.pool_key = key
+
+    if not source.isOpened():
+        print(f"Unable to open frame source '{kind}' ({cfg.frame_source_path}).")
+        source.release()
+        return None
+    return source
@@ -1,3 +1,7 @@
+import cv2
+import numpy as np
+
+
 class HandCropper:
     def __init__(self, output_width, output_height, smoothing_factor=0.1):
         self.output_width = output_width
@@ -11,32 +15,27 @@ class HandCropper:
             self.current_crop_x = (frame_width - self.output_width) // 2
             self.current_crop_y = (frame_height - self.output_height) // 2
 
-    def crop(self, frame, multi_hand_landmarks):
-        h, w = frame.shape[:2]
+    def crop_box(self, w, h, hands):
+        # hands is the (hands, 21, 2+) array of normalised landmarks, the box is returned in
+        # mirrored frame coordinates since that is what the preview shows.
         self._init_if_needed(w, h)
 
-        target_center_x = w // 2
-        target_center_y = h // 2
-        hand_found = False
-
-        if multi_hand_landmarks:
-            hand_found = True
-            centers = []
-            for hand_landmarks in multi_hand_landmarks:
-                wrist = hand_landmarks[0]
-                middle_tip = hand_landmarks[12]
-                cx = int((wrist.x + middle_tip.x) / 2 * w)
-                cx = w - cx
-                cy = int((wrist.y + middle_tip.y) / 2 * h)
+        centers = []
+        if hands is not None:
+            for hand in hands:
+                if np.isnan(hand[0, 0]) or np.isnan(hand[12, 0]):
+                    continue
+                cx = w - int((hand[0, 0] + hand[12, 0]) / 2 * w)
+                cy = int((hand[0, 1] + hand[12, 1]) / 2 * h)
                 centers.append((cx, cy))
+
+        if centers:
             if len(centers) == 1:
                 target_center_x, target_center_y = centers[0]
             else:
                 (x1, y1), (x2, y2) = centers[0], centers[1]
                 target_center_x = (x1 + x2) // 2
                 target_center_y = (y1 + y2) // 2
-
-        if hand_found:
             target_crop_x = target_center_x - (self.output_width // 2)
             target_crop_y = target_center_y - (self.output_height // 2)
         else:
@@ -48,7 +47,13 @@ class HandCropper:
 
         x1 = int(max(0, min(self.current_crop_x, w - self.output_width)))
         y1 = int(max(0, min(self.current_crop_y, h - self.output_height)))
-        x2 = x1 + self.output_width
-        y2 = y1 + self.output_height
+        x2 = min(x1 + self.output_width, w)
+        y2 = min(y1 + self.output_height, h)
+        return x1, y1, x2, y2
 
-        return frame[y1:y2, x1:x2]
\ No newline at end of file
+    def crop(self, frame, hands):
+        # Cuts the box out of the unmirrored camera frame and flips only that, the full frame is
+        # never copied. Returns the mirrored crop and its top-left corner in mirrored coordinates.
+        h, w = frame.shape[:2]
+        x1, y1, x2, y2 = self.crop_box(w, h, hands)
+        return cv2.flip(frame[y1:y2, w - x2:w - x1], 1), (x1, y1)
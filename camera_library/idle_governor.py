@@ -0,0 +1,94 @@
+import time
+import cv2
+import numpy as np
+
+MOTION_THUMBNAIL_SIZE = (32, 24)
+
+
+class IdleGovernor:
+    # Runs inference at full rate while hands are around. After idle_after seconds without a
+    # hand it only runs idle_fps times per second on a downscaled frame, unless a cheap
+    # frame-difference check sees motion, in which case the next frame is processed at once.
+    def __init__(self, idle_after=5.0, idle_fps=4.0, idle_scale=0.5, motion_threshold=6.0):
+        self.idle_after = idle_after
+        self.idle_fps = idle_fps
+        self.idle_scale = idle_scale
+        self.motion_threshold = motion_threshold
+        self.idle = False
+        self.transitions = 0
+        self.skipped_frames = 0
+        self._last_hand_time = time.monotonic()
+        self._last_processed = 0.0
+        self._thumbnail = None
+        self._state_since = time.monotonic()
+        self._state_cpu = time.process_time()
+        # Accumulated [wall seconds, cpu seconds] per state.
+        self._usage = {"active": [0.0, 0.0], "idle": [0.0, 0.0]}
+
+    @property
+    def state(self):
+        return "idle" if self.idle else "active"
+
+    def should_process(self, frame, now=None):
+        if not self.idle:
+            return True
+        if now is None:
+            now = time.monotonic()
+        if self._motion(frame) or now - self._last_processed >= 1.0 / max(self.idle_fps, 0.1):
+            self._last_processed = now
+            return True
+        self.skipped_frames += 1
+        return False
+
+    def _motion(self, frame):
+        gray = cv2.cvtColor(cv2.resize(frame, MOTION_THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        previous = self._thumbnail
+        self._thumbnail = gray.astype(np.int16)
+        if previous is None:
+            return False
+        return float(np.mean(np.abs(self._thumbnail - previous))) > self.motion_threshold
+
+    def input_frame(self, frame):
+        if not self.idle or self.idle_scale >= 1.0:
+            return frame
+        # Landmarks are normalised, a hand found on the small frame maps straight back.
+        return cv2.resize(frame, None, fx=self.idle_scale, fy=self.idle_scale, interpolation=cv2.INTER_AREA)
+
+    def update(self, hands_present, now=None):
+        if now is None:
+            now = time.monotonic()
+        if hands_present:
+            self._last_hand_time = now
+            if self.idle:
+                self._switch(False, now)
+        elif not self.idle and self.idle_after > 0 and now - self._last_hand_time >= self.idle_after:
+            self._switch(True, now)
+
+    def _switch(self, idle, now):
+        self._account(now)
+        self.idle = idle
+        self.transitions += 1
+        self._thumbnail = None
+        self._last_processed = now
+
+    def _account(self, now):
+        cpu = time.process_time()
+        usage = self._usage[self.state]
+        usage[0] += now - self._state_since
+        usage[1] += cpu - self._state_cpu
+        self._state_since = now
+        self._state_cpu = cpu
+
+    def cpu_usage(self):
+        # Process CPU (all threads, as a percentage of one core) averaged over the time spent in each state.
+        self._account(time.monotonic())
+        return {
+            state: round(100.0 * cpu / wall, 1) if wall > 0 else None
+            for state, (wall, cpu) in self._usage.items()
+        }
+
+    def stats(self):
+        stats = {"state": self.state, "transitions": self.transitions, "skipped_idle": self.skipped_frames}
+        for state, cpu_pct in self.cpu_usage().items():
+            stats[f"cpu_{state}_pct"] = cpu_pct
+        return stats
@@ -0,0 +1,118 @@
+import cv2
+import numpy as np
+from camera_library.camera_display import landmarks_to_array
+from hand_recognition.landmark_recording import ReplayResult
+
+LK_PARAMS = dict(
+    winSize=(15, 15),
+    maxLevel=2,
+    criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03),
+)
+
+
+class KeyframeTracker:
+    # Between two model runs the 21 landmarks of every hand are moved with sparse optical flow.
+    # Only a padded box around the hands is converted to grayscale and tracked, and the gesture
+    # classification of the last keyframe is reused.
+    def __init__(self, interval=3, min_tracked=0.8, max_fb_error=1.5, padding=0.3):
+        self.interval = interval
+        self.min_tracked = min_tracked
+        self.max_fb_error = max_fb_error
+        self.padding = padding
+        self.keyframes = 0
+        self.tracked_frames = 0
+        self.tracking_failures = 0
+        self.reset()
+
+    def reset(self):
+        self._result = None
+        self._points = None
+        self._box = None
+        self._gray = None
+        self._frames_since_key = 0
+
+    def _box_for(self, points, w, h):
+        xy = points.reshape(-1, 2)
+        min_x, min_y = xy.min(axis=0)
+        max_x, max_y = xy.max(axis=0)
+        pad = self.padding * max(max_x - min_x, max_y - min_y, 32.0)
+        x1 = int(max(0, min_x - pad))
+        y1 = int(max(0, min_y - pad))
+        x2 = int(min(w, max_x + pad + 1))
+        y2 = int(min(h, max_y + pad + 1))
+        if x2 - x1 < 8 or y2 - y1 < 8:
+            return None
+        return x1, y1, x2, y2
+
+    def _remember(self, frame, points, result):
+        h, w = frame.shape[:2]
+        self._box = self._box_for(points, w, h)
+        if self._box is None:
+            self.reset()
+            return
+        x1, y1, x2, y2 = self._box
+        self._gray = cv2.cvtColor(frame[y1:y2, x1:x2], cv2.COLOR_BGR2GRAY)
+        self._points = points
+        self._result = result
+
+    def keyframe(self, frame, recognition_result):
+        # Called with the model output, before anything is drawn onto the frame.
+        self.keyframes += 1
+        self._frames_since_key = 0
+        hands = getattr(recognition_result, "landmark_array", None)
+        if hands is None:
+            hands = landmarks_to_array(recognition_result.hand_landmarks)
+        if len(hands) == 0 or np.isnan(hands).any():
+            self.reset()
+            return
+        h, w = frame.shape[:2]
+        points = (hands[:, :, :2] * (w, h)).astype(np.float32)
+        result = ReplayResult(recognition_result.gestures, recognition_result.handedness, hands)
+        self._remember(frame, points, result)
+
+    def track(self, frame):
+        # Returns a result for this frame, or None when the model has to run instead.
+        if self._result is None or self._frames_since_key + 1 >= self.interval:
+            return None
+
+        h, w = frame.shape[:2]
+        x1, y1, x2, y2 = self._box
+        gray = cv2.cvtColor(frame[y1:y2, x1:x2], cv2.COLOR_BGR2GRAY)
+        offset = np.array([x1, y1], dtype=np.float32)
+        prev_points = (self._points.reshape(-1, 2) - offset).reshape(-1, 1, 2)
+
+        next_points, status, _ = cv2.calcOpticalFlowPyrLK(self._gray, gray, prev_points, None, **LK_PARAMS)
+        back_points, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self._gray, next_points, None, **LK_PARAMS)
+        # Forward-backward check: a point that does not come back to where it started was lost.
+        fb_error = np.linalg.norm((back_points - prev_points).reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < self.max_fb_error)
+
+        hand_count = len(self._points)
+        good = good.reshape(hand_count, -1)
+        if good.mean(axis=1).min() < self.min_tracked:
+            self.tracking_failures += 1
+            return None
+
+        moved = next_points.reshape(hand_count, -1, 2) + offset
+        previous = self._points
+        for i in range(hand_count):
+            # Points that were lost follow the median motion of their hand.
+            shift = np.median(moved[i][good[i]] - previous[i][good[i]], axis=0)
+            moved[i][~good[i]] = previous[i][~good[i]] + shift
+
+        hands = self._result.landmark_array.copy()
+        hands[:, :, 0] = moved[:, :, 0] / w
+        hands[:, :, 1] = moved[:, :, 1] / h
+        result = ReplayResult(self._result.gestures, self._result.handedness, hands)
+
+        self._frames_since_key += 1
+        self.tracked_frames += 1
+        self._remember(frame, moved.astype(np.float32), result)
+        return result
+
+    def stats(self):
+        return {
+            "keyframes": self.keyframes,
+            "tracked_frames": self.tracked_frames,
+            "tracking_failures": self.tracking_failures,
+        }
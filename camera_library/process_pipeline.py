@@ -0,0 +1,323 @@
+import multiprocessing as mp
+import os
+import queue
+import time
+import traceback
+from multiprocessing import shared_memory
+import numpy as np
+from configuration.configuration import cfg
+from diagnostics_library.metrics import LatencyHistogram
+
+# Kept light on purpose: this module is imported by the spawned worker before anything heavy,
+# OpenCV, MediaPipe and the input libraries are only imported inside _worker_main.
+
+RING_SLOTS = 3
+MAX_HANDS = 2
+ALIGNMENT = 64
+HOPS = ("worker", "publish", "ipc", "render", "end_to_end")
+
+
+def _aligned(size):
+    return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _attach(name):
+    # Only the worker that created a block may unlink it. Before Python 3.13 attaching also
+    # registered the block with the resource tracker, which then removed it at exit.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name == "posix":
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def current_settings():
+    # Everything the worker needs to start with the settings of this process, picklable.
+    values = dict(vars(cfg.snapshot()))
+    values.pop("version", None)
+    values["custom_hotkeys"] = dict(values["custom_hotkeys"])
+    return values
+
+
+class SharedFrameRing:
+    # A few frame slots, each followed by the landmark array of that frame, in one shared memory
+    # block. Every slot has a sequence number that is odd while the slot is being written: a
+    # reader compares it before and after using a slot and drops the frame if it changed.
+    def __init__(self, shape, slots=RING_SLOTS, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        self._frame_bytes = _aligned(int(np.prod(self.shape)))
+        self._hands_bytes = _aligned(MAX_HANDS * 21 * 2 * 4)
+        self._slot_bytes = self._frame_bytes + self._hands_bytes
+        self._header_bytes = _aligned(slots * 8)
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=self._header_bytes + slots * self._slot_bytes)
+        else:
+            self.shm = _attach(name)
+        self.name = self.shm.name
+        self._seq = np.ndarray((slots,), dtype=np.int64, buffer=self.shm.buf)
+        if self.owner:
+            self._seq[:] = 0
+        self._frames = []
+        self._hands = []
+        for slot in range(slots):
+            offset = self._header_bytes + slot * self._slot_bytes
+            self._frames.append(np.ndarray(self.shape, dtype=np.uint8, buffer=self.shm.buf, offset=offset))
+            self._hands.append(np.ndarray((MAX_HANDS, 21, 2), dtype=np.float32, buffer=self.shm.buf, offset=offset + self._frame_bytes))
+        self._next_slot = 0
+
+    def write(self, frame, hands):
+        # Worker side. The oldest slot is overwritten, the reader only ever wants the newest frame.
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % self.slots
+        count = 0 if hands is None else min(len(hands), MAX_HANDS)
+        self._seq[slot] += 1
+        np.copyto(self._frames[slot], frame)
+        if count:
+            self._hands[slot][:count] = hands[:count, :, :2]
+        self._seq[slot] += 1
+        return slot, int(self._seq[slot]), count
+
+    def frame(self, slot):
+        return self._frames[slot]
+
+    def hands(self, slot, count):
+        return self._hands[slot][:count].copy()
+
+    def valid(self, slot, seq):
+        return int(self._seq[slot]) == seq
+
+    def close(self):
+        # The views have to go before the mapping can be closed.
+        self._seq = None
+        self._frames = []
+        self._hands = []
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _worker_main(camera_index, settings, commands, results, stop_event):
+    from camera_library.recognition_main_loop import FrameRecognizer
+    from camera_library.frame_sources import create_frame_source, release_frame_source, camera_pool
+    from camera_library.frame_grabber import FrameGrabber
+    from camera_library.camera_capabilities import describe_mode
+    from camera_library.recognizer_warmup import recognizer_pool
+    from configuration.config_persistence import start_config_watcher
+    from diagnostics_library.metrics import pipeline_metrics
+    from diagnostics_library.debug_capture import debug_capture
+    from diagnostics_library.event_log import event_log
+    from function_library.cursor_output import cursor_output
+
+    def send(message):
+        try:
+            results.put_nowait(message)
+            return True
+        except queue.Full:
+            return False
+
+    for key, value in settings.items():
+        cfg.update(key, value)
+    cfg.apply_pending()
+
+    frame_recognizer = FrameRecognizer(
+        live_stream=cfg.live_stream_mode,
+        roi_tracking=cfg.roi_tracking,
+        record_landmarks=cfg.record_landmarks,
+        idle_mode=cfg.idle_mode,
+        keyframe_interval=cfg.keyframe_interval,
+    )
+    if frame_recognizer.recognizer is None:
+        send(("error", "Failed to init recognizer"))
+        return
+    source = create_frame_source(camera_index)
+    if not source or not source.isOpened():
+        frame_recognizer.close()
+        send(("error", f"Cannot open camera {camera_index}"))
+        return
+
+    grabber = FrameGrabber(source, drop_frames=source.realtime).start()
+    config_watcher = start_config_watcher()
+    pipeline_metrics.reset()
+    if getattr(source, "mode", None):
+        pipeline_metrics.set_gauge("camera", describe_mode(source.mode))
+    ring = None
+    unsent = 0
+    next_preview = 0.0
+    cfg.begin_loop()
+    try:
+        while not stop_event.is_set():
+            try:
+                while True:
+                    for key, value in commands.get_nowait().items():
+                        cfg.update(key, value)
+            except queue.Empty:
+                pass
+
+            ret, frame, frame_time = grabber.read(timeout=0.1)
+            if not ret:
+                if not grabber.running:
+                    break
+                continue
+
+            config = cfg.begin_frame()
+            output = frame_recognizer.process(frame, frame_time, grabber.last_arrival_time, config)
+            pipeline_metrics.set_dropped(grabber.dropped_frames + frame_recognizer.dropped_frames)
+            snapshot = pipeline_metrics.snapshot_if_due()
+            if snapshot:
+                snapshot["gauges"]["unsent_previews"] = unsent
+                send(("metrics", snapshot))
+            if output is None or not config.preview_enabled:
+                continue
+            now = time.monotonic()
+            if now < next_preview:
+                continue
+            if config.preview_fps > 0:
+                next_preview = max(next_preview + 1.0 / config.preview_fps, now)
+
+            frame, _, overlay = output
+            processed_time = now
+            if ring is None or ring.shape != frame.shape:
+                if ring is not None:
+                    ring.close()
+                ring = SharedFrameRing(frame.shape)
+                try:
+                    results.put(("ring", ring.name, ring.shape), timeout=1.0)
+                except queue.Full:
+                    ring.close()
+                    ring = None
+                    continue
+            slot, seq, count = ring.write(frame, overlay.hands)
+            message = (
+                "frame", slot, seq, count, overlay.hand_labels, overlay.left_text, overlay.right_text,
+                grabber.last_arrival_time, processed_time, time.monotonic(),
+            )
+            if not send(message):
+                unsent += 1
+    except KeyboardInterrupt:
+        pass
+    except Exception:
+        send(("error", traceback.format_exc()))
+    finally:
+        cfg.end_loop()
+        config_watcher.stop()
+        grabber.stop()
+        release_frame_source(source)
+        frame_recognizer.close()
+        recognizer_pool.clear()
+        camera_pool.clear()
+        cursor_output.stop_motion()
+        debug_capture.stop()
+        event_log.stop()
+        if ring is not None:
+            ring.close()
+
+
+class ProcessPipeline:
+    # Runs capture, inference, post-processing and the actions in a worker process, so the Qt
+    # event loop and the recognizer never compete for the same GIL. Frames come back through a
+    # SharedFrameRing, the queue only carries slot numbers, labels and timestamps.
+    def __init__(self, camera_index, settings=None):
+        if settings is None:
+            settings = current_settings()
+        context = mp.get_context("spawn")
+        self.camera_index = camera_index
+        self.ring = None
+        self.dropped_frames = 0
+        self._commands = context.Queue()
+        self._results = context.Queue(maxsize=8)
+        self._stop_event = context.Event()
+        self._process = context.Process(
+            target=_worker_main,
+            args=(camera_index, settings, self._commands, self._results, self._stop_event),
+            name="RecognitionWorker",
+            daemon=True,
+        )
+        self.hops = {hop: LatencyHistogram() for hop in HOPS}
+
+    def start(self):
+        self._process.start()
+        cfg.add_listener(self._forward_settings)
+        return self
+
+    def _forward_settings(self, changed):
+        # Settings changed in the UI reach the worker right away, the worker's own file watcher
+        # would only see them once they are saved.
+        self._commands.put({key: getattr(cfg, key) for key in changed})
+
+    def is_alive(self):
+        return self._process.is_alive()
+
+    def get(self, timeout=0.1):
+        # Returns the next ("frame" | "metrics" | "error", ...) message, ring changes are handled here.
+        try:
+            message = self._results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if message[0] == "ring":
+            if self.ring is not None:
+                self.ring.close()
+            self.ring = SharedFrameRing(message[2], name=message[1])
+            return self.get(0)
+        return message
+
+    def preview(self, message, cropper):
+        # Crops and mirrors straight out of shared memory, then checks that the worker did not
+        # reuse the slot meanwhile. Returns the crop and a HandOverlay for it, or None.
+        from camera_library.camera_display import HandOverlay
+
+        _, slot, seq, count, hand_labels, left_text, right_text, arrival, processed, published = message
+        received = time.monotonic()
+        if self.ring is None or not self.ring.valid(slot, seq):
+            self.dropped_frames += 1
+            return None
+        frame = self.ring.frame(slot)
+        hands = self.ring.hands(slot, count)
+        cropped_frame, origin = cropper.crop(frame, hands)
+        if not self.ring.valid(slot, seq):
+            self.dropped_frames += 1
+            return None
+        overlay = HandOverlay(hands, hand_labels, left_text, right_text)
+        overlay.draw(cropped_frame, (frame.shape[1], frame.shape[0]), origin)
+
+        if arrival is not None:
+            self.hops["worker"].record(processed - arrival)
+        self.hops["publish"].record(published - processed)
+        self.hops["ipc"].record(received - published)
+        return cropped_frame, received, arrival
+
+    def rendered(self, received, arrival):
+        now = time.monotonic()
+        self.hops["render"].record(now - received)
+        if arrival is not None:
+            self.hops["end_to_end"].record(now - arrival)
+
+    def add_hop_gauges(self, snapshot):
+        # Per-hop latency as seen from the UI process over the last metrics window.
+        for hop, histogram in self.hops.items():
+            if histogram.count:
+                snapshot["gauges"][f"hop {hop}"] = f"p50 {histogram.percentile(0.5):.1f} / p95 {histogram.percentile(0.95):.1f} ms"
+            histogram.reset()
+        snapshot["gauges"]["ui_dropped"] = self.dropped_frames
+        return snapshot
+
+    def stop(self, timeout=3.0):
+        cfg.remove_listener(self._forward_settings)
+        self._stop_event.set()
+        self._process.join(timeout)
+        if self._process.is_alive():
+            self._process.terminate()
+            self._process.join(1.0)
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+        for q in (self._commands, self._results):
+            q.cancel_join_thread()
+            q.close()
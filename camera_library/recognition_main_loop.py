@@ -1,63 +1,342 @@
 import time
+import threading
 import cv2
 import mediapipe as mp
 from mediapipe.tasks import python as mp_tasks_python
 from mediapipe.tasks.python import vision as mp_tasks_vision
 from configuration.configuration import cfg
-from camera_library.camera_display import create_camera_capture
+from camera_library.frame_sources import create_frame_source, release_frame_source, camera_pool
+from camera_library.camera_display import draw_metrics_overlay
+from camera_library.camera_capabilities import describe_mode
 from hand_recognition.hand_processing import process_hands
 from camera_library.hand_croper import HandCropper
+from camera_library.frame_grabber import FrameGrabber
+from camera_library.roi_tracker import RoiTracker
+from camera_library.idle_governor import IdleGovernor
+from camera_library.keyframe_tracker import KeyframeTracker
+from hand_recognition.landmark_recording import create_session_recorder
+from hand_recognition.gesture_state import GestureTracker
+from diagnostics_library.metrics import pipeline_metrics, format_snapshot
+from function_library.cursor_output import cursor_output
+from diagnostics_library.debug_capture import debug_capture
+from diagnostics_library.event_log import event_log
+from configuration.config_persistence import start_config_watcher
+from camera_library.recognizer_warmup import recognizer_warmup, recognizer_pool, recognizer_key
 
-def create_gesture_recognizer():
+def create_gesture_recognizer(result_callback=None, model_path=None, num_hands=2):
     if mp_tasks_python is None or mp_tasks_vision is None:
         print("No MediaPipe Tasks API (GestureRecognizer) available.")
         return None
 
-    base_options = mp_tasks_python.BaseOptions(model_asset_path=cfg.MODEL_FILENAME)
-    options = mp_tasks_vision.GestureRecognizerOptions(
-        base_options=base_options,
-        num_hands=2,
-        running_mode=mp_tasks_vision.RunningMode.VIDEO,
-    )
+    base_options = mp_tasks_python.BaseOptions(model_asset_path=model_path or cfg.MODEL_FILENAME)
+    if result_callback is not None:
+        options = mp_tasks_vision.GestureRecognizerOptions(
+            base_options=base_options,
+            num_hands=num_hands,
+            running_mode=mp_tasks_vision.RunningMode.LIVE_STREAM,
+            result_callback=result_callback,
+        )
+    else:
+        options = mp_tasks_vision.GestureRecognizerOptions(
+            base_options=base_options,
+            num_hands=num_hands,
+            running_mode=mp_tasks_vision.RunningMode.VIDEO,
+        )
     return mp_tasks_vision.GestureRecognizer.create_from_options(options)
 
 def to_mp_image(frame):
     image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
     return mp.Image(image_format=mp.ImageFormat.SRGB, data=image_rgb)
 
+class FrameTimestamper:
+    def __init__(self):
+        self._last_ms = -1
+
+    def next_ms(self, frame_time=None):
+        if frame_time is None:
+            frame_time = time.monotonic()
+        # MediaPipe rejects timestamps that are not strictly increasing.
+        timestamp_ms = int(frame_time * 1000)
+        if timestamp_ms <= self._last_ms:
+            timestamp_ms = self._last_ms + 1
+        self._last_ms = timestamp_ms
+        return timestamp_ms
+
+class FrameRecognizer:
+    def __init__(self, live_stream=False, roi_tracking=False, record_landmarks=False, idle_mode=False, keyframe_interval=1, busy_timeout=1.0, warmup_timeout=15.0):
+        self.live_stream = live_stream
+        self.busy_timeout = busy_timeout
+        self.timestamps = FrameTimestamper()
+        self.submitted_frames = 0
+        self.dropped_frames = 0
+        self._lock = threading.Lock()
+        self._busy_since = None
+        self._pending = {}
+        self._output = None
+        self.roi_tracker = None
+        if roi_tracking:
+            self.roi_tracker = RoiTracker(
+                padding=cfg.roi_padding,
+                min_size=cfg.roi_min_size,
+                full_frame_interval=cfg.roi_full_frame_interval,
+            )
+        self.recorder = create_session_recorder(cfg.recording_dir, cfg.record_label) if record_landmarks else None
+        self.governor = None
+        if idle_mode:
+            self.governor = IdleGovernor(
+                idle_after=cfg.idle_after,
+                idle_fps=cfg.idle_fps,
+                idle_scale=cfg.idle_scale,
+                motion_threshold=cfg.idle_motion_threshold,
+            )
+        self._next_idle_report = 0.0
+        # Keyframe tracking needs the result of a frame before the next one, so VIDEO mode only.
+        self.keyframes = None
+        if keyframe_interval > 1 and not live_stream:
+            self.keyframes = KeyframeTracker(
+                interval=keyframe_interval,
+                min_tracked=cfg.keyframe_min_tracked,
+                max_fb_error=cfg.keyframe_max_fb_error,
+            )
+        self.gesture_tracker = GestureTracker()
+        recognizer_warmup.wait(warmup_timeout)
+        self._pool_key = recognizer_key(live_stream)
+        self.warm = recognizer_pool.acquire(self._pool_key)
+        self.recognizer = None
+        if self.warm is not None:
+            self.recognizer = self.warm.recognizer
+            self.timestamps = self.warm.timestamps
+            if self.warm.relay is not None:
+                self.warm.relay.target = self._on_result
+
+    def _region(self, frame):
+        if self.roi_tracker is None:
+            return None
+        h, w = frame.shape[:2]
+        return self.roi_tracker.region(w, h)
+
+    def _track(self, frame, recognition_result, roi, timestamp_ms):
+        if self.roi_tracker is not None:
+            h, w = frame.shape[:2]
+            self.roi_tracker.update(recognition_result, roi, w, h)
+        if self.recorder is not None:
+            self.recorder.add_frame(timestamp_ms / 1000.0, recognition_result)
+        if self.governor is not None:
+            self.governor.update(bool(recognition_result.hand_landmarks))
+
+    def _input_image(self, frame, roi):
+        if roi is None:
+            if self.governor is not None:
+                frame = self.governor.input_frame(frame)
+            return to_mp_image(frame)
+        return to_mp_image(self.roi_tracker.crop(frame, roi))
+
+    def _idle_skip(self, frame):
+        now = time.monotonic()
+        if now >= self._next_idle_report:
+            self._next_idle_report = now + 1.0
+            pipeline_metrics.set_gauge("mode", self.governor.state)
+            for state, cpu_pct in self.governor.cpu_usage().items():
+                pipeline_metrics.set_gauge(f"cpu_{state}_pct", cpu_pct)
+        return not self.governor.should_process(frame, now)
+
+    def process(self, frame, frame_time=None, arrival_time=None, config=None):
+        # config is the snapshot from cfg.begin_frame(), post-processing of this frame reads it.
+        if self.governor is not None and self._idle_skip(frame):
+            return None
+        if config is None:
+            config = cfg.snapshot()
+        if self.live_stream:
+            return self._process_async(frame, frame_time, arrival_time, config)
+        if self.keyframes is not None:
+            output = self._process_tracked(frame, arrival_time, config)
+            if output is not None:
+                return output
+        roi = self._region(frame)
+        timestamp_ms = self.timestamps.next_ms(frame_time)
+        inference_start = time.monotonic()
+        recognition_result = self.recognizer.recognize_for_video(self._input_image(frame, roi), timestamp_ms)
+        pipeline_metrics.record("inference", time.monotonic() - inference_start)
+        self.submitted_frames += 1
+        self._track(frame, recognition_result, roi, timestamp_ms)
+        if self.keyframes is not None:
+            self.keyframes.keyframe(frame, recognition_result)
+        overlay = process_hands(frame, recognition_result, self.gesture_tracker, config)
+        pipeline_metrics.frame_done(arrival_time)
+        return frame, recognition_result, overlay
+
+    def _process_tracked(self, frame, arrival_time, config):
+        tracking_start = time.monotonic()
+        tracked = self.keyframes.track(frame)
+        if tracked is None:
+            return None
+        pipeline_metrics.record("tracking", time.monotonic() - tracking_start)
+        # Not recorded: recordings are replayed to measure accuracy and used as classifier
+        # training data, landmarks moved by optical flow would pass for model output there.
+        if self.governor is not None:
+            self.governor.update(True)
+        overlay = process_hands(frame, tracked, self.gesture_tracker, config)
+        pipeline_metrics.frame_done(arrival_time)
+        return frame, tracked, overlay
+
+    def _process_async(self, frame, frame_time, arrival_time, config):
+        now = time.monotonic()
+        with self._lock:
+            # A callback that never arrives (e.g. MediaPipe dropped the frame itself) must not block the stream.
+            if self._busy_since is not None and now - self._busy_since > self.busy_timeout:
+                self._busy_since = None
+                self._pending.clear()
+            if self._busy_since is not None:
+                self.dropped_frames += 1
+                timestamp_ms = None
+            else:
+                self._busy_since = now
+                timestamp_ms = self.timestamps.next_ms(frame_time)
+                roi = self._region(frame)
+                self._pending[timestamp_ms] = (frame, roi, arrival_time, config)
+
+        if timestamp_ms is not None:
+            try:
+                self.recognizer.recognize_async(self._input_image(frame, roi), timestamp_ms)
+                self.submitted_frames += 1
+            except Exception:
+                with self._lock:
+                    self._pending.pop(timestamp_ms, None)
+                    self._busy_since = None
+                raise
+
+        with self._lock:
+            output = self._output
+            self._output = None
+        return output
+
+    def _on_result(self, recognition_result, output_image, timestamp_ms):
+        with self._lock:
+            pending = self._pending.pop(timestamp_ms, None)
+            submitted_at = self._busy_since
+        try:
+            if pending is not None:
+                frame, roi, arrival_time, config = pending
+                if submitted_at is not None:
+                    pipeline_metrics.record("inference", time.monotonic() - submitted_at)
+                self._track(frame, recognition_result, roi, timestamp_ms)
+                output = (frame, recognition_result, process_hands(frame, recognition_result, self.gesture_tracker, config))
+                pipeline_metrics.frame_done(arrival_time)
+                with self._lock:
+                    self._output = output
+        except Exception as e:
+            print(f"Error in recognizer callback: {e}")
+        finally:
+            with self._lock:
+                self._busy_since = None
+
+    def stats(self):
+        with self._lock:
+            stats = {"submitted": self.submitted_frames, "dropped_busy": self.dropped_frames}
+        if self.roi_tracker is not None:
+            stats.update(self.roi_tracker.stats())
+        if self.governor is not None:
+            stats.update(self.governor.stats())
+        if self.keyframes is not None:
+            stats.update(self.keyframes.stats())
+        return stats
+
+    def close(self):
+        # The recognizer goes back to the pool and stays warm for the next start.
+        if self.warm is not None:
+            if self.warm.relay is not None:
+                self.warm.relay.target = None
+            recognizer_pool.release(self._pool_key, self.warm)
+            self.warm = None
+            self.recognizer = None
+        if self.recorder is not None:
+            try:
+                self.recorder.close()
+                if cfg.debug_mode:
+                    print(f"Landmark recording saved to {self.recorder.path}")
+            except Exception as e:
+                print(f"Failed to save landmark recording: {e}")
+            self.recorder = None
+
 def start_recognition():
-    recognizer = create_gesture_recognizer()
-    if recognizer is None:
+    frame_recognizer = FrameRecognizer(
+        live_stream=cfg.live_stream_mode,
+        roi_tracking=cfg.roi_tracking,
+        record_landmarks=cfg.record_landmarks,
+        idle_mode=cfg.idle_mode,
+        keyframe_interval=cfg.keyframe_interval,
+    )
+    if frame_recognizer.recognizer is None:
         return
 
-    cap = create_camera_capture()
-    if cap is None:
+    source = create_frame_source()
+    if source is None:
+        frame_recognizer.close()
         return  
+    grabber = FrameGrabber(source, drop_frames=source.realtime).start()
+    pipeline_metrics.reset()
+    if getattr(source, "mode", None):
+        pipeline_metrics.set_gauge("camera", describe_mode(source.mode))
+    config_watcher = start_config_watcher()
     cropper = HandCropper(
         output_width=min(cfg.camera_width_crop, cfg.camera_width_default),
         output_height=min(cfg.camera_height_crop, cfg.camera_height_default),
         smoothing_factor=0.1,
     )
+    next_preview = 0.0
+    cfg.begin_loop()
     try:
         while True:
-            ret, frame = cap.read()
+            ret, frame, frame_time = grabber.read()
             if not ret:
-                break
-            mp_image = to_mp_image(frame)
-            timestamp_ms = int(time.time() * 1000)
-            recognition_result = recognizer.recognize_for_video(mp_image, timestamp_ms)
-            frame = process_hands(frame, recognition_result)
-
-            hand_landmarks_list = (
-                recognition_result.hand_landmarks
-                if recognition_result and recognition_result.hand_landmarks
-                else None
-            )
-            cropped_frame = cropper.crop(frame, hand_landmarks_list)
+                if not grabber.running:
+                    break
+                if cfg.preview_enabled and cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+                continue
+            config = cfg.begin_frame()
+            output = frame_recognizer.process(frame, frame_time, grabber.last_arrival_time, config)
+            pipeline_metrics.set_dropped(grabber.dropped_frames + frame_recognizer.dropped_frames)
+            snapshot = pipeline_metrics.snapshot_if_due()
+            if snapshot and config.debug_mode:
+                print(" | ".join(format_snapshot(snapshot)))
+            if output is None:
+                if config.preview_enabled and cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+                continue
+            # Headless (preview off) runs until Ctrl+C, otherwise the window is refreshed at preview_fps.
+            now = time.monotonic()
+            if not config.preview_enabled or now < next_preview:
+                continue
+            if config.preview_fps > 0:
+                next_preview = max(next_preview + 1.0 / config.preview_fps, now)
+            frame, _, overlay = output
+
+            # Crop and mirror first, the overlay is then drawn on the preview-sized image only.
+            cropped_frame, origin = cropper.crop(frame, overlay.hands)
+            overlay.draw(cropped_frame, (frame.shape[1], frame.shape[0]), origin)
+            if config.metrics_overlay:
+                draw_metrics_overlay(cropped_frame, pipeline_metrics.latest)
 
-            cv2.imshow("Gesture Recognizer - press q to quit", cropped_frame)
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            cv2.imshow("Gesture Recognizer - press q to quit, d to save debug clip", cropped_frame)
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord('q'):
                 break
+            if key == ord('d'):
+                debug_capture.dump()
+    except KeyboardInterrupt:
+        pass
     finally:
-        cap.release()
+        cfg.end_loop()
+        config_watcher.stop()
+        grabber.stop()
+        if cfg.debug_mode:
+            print(f"Capture stats: {grabber.stats()}, recognizer stats: {frame_recognizer.stats()}")
+        release_frame_source(source)
+        frame_recognizer.close()
+        recognizer_pool.clear()
+        camera_pool.clear()
+        cursor_output.stop_motion()
+        debug_capture.stop()
+        event_log.stop()
         cv2.destroyAllWindows()
\ No newline at end of file
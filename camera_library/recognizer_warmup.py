@@ -0,0 +1,127 @@
+import threading
+from configuration.configuration import cfg
+from diagnostics_library.startup_timing import startup_timer
+from camera_library.resource_pool import ResourcePool
+
+# Loaded on the warm-up thread so the first "Start Camera" does not pay for them.
+PIPELINE_MODULES = (
+    "numpy",
+    "cv2",
+    "mediapipe",
+    "camera_library.recognition_main_loop",
+    "hand_recognition.hand_processing",
+    "configuration.function_assigne.function_configuration",
+    "function_library.cursor_output",
+    "function_library.action_executor",
+)
+# With process_pipeline the worker process loads its own recognizer, this process only shows the preview.
+PREVIEW_MODULES = (
+    "numpy",
+    "cv2",
+    "camera_library.camera_display",
+    "camera_library.hand_croper",
+    "camera_library.process_pipeline",
+)
+
+
+class _CallbackRelay:
+    # A LIVE_STREAM recognizer is bound to its callback at creation, the relay lets the
+    # FrameRecognizer that takes over a warmed-up recognizer receive its results.
+    def __init__(self):
+        self.target = None
+
+    def __call__(self, recognition_result, output_image, timestamp_ms):
+        target = self.target
+        if target is not None:
+            target(recognition_result, output_image, timestamp_ms)
+
+
+class WarmRecognizer:
+    def __init__(self, model_path, num_hands, live_stream):
+        import numpy as np
+        from camera_library.recognition_main_loop import create_gesture_recognizer, to_mp_image, FrameTimestamper
+
+        self.live_stream = live_stream
+        self.relay = _CallbackRelay() if live_stream else None
+        self.recognizer = create_gesture_recognizer(self.relay, model_path=model_path, num_hands=num_hands)
+        # Timestamps stay with the recognizer: MediaPipe wants them increasing for its whole life.
+        self.timestamps = FrameTimestamper()
+        if self.recognizer is None:
+            return
+
+        # The first inference initialises the graph and its buffers, do it on a black frame.
+        dummy = np.zeros((cfg.camera_height_default, cfg.camera_width_default, 3), dtype=np.uint8)
+        if live_stream:
+            self.recognizer.recognize_async(to_mp_image(dummy), self.timestamps.next_ms(0.0))
+        else:
+            self.recognizer.recognize_for_video(to_mp_image(dummy), self.timestamps.next_ms(0.0))
+
+    def close(self):
+        if self.relay is not None:
+            self.relay.target = None
+        if self.recognizer is not None:
+            self.recognizer.close()
+            self.recognizer = None
+
+
+def recognizer_key(live_stream, num_hands=2):
+    return cfg.MODEL_FILENAME, num_hands, bool(live_stream)
+
+
+def _create_warm_recognizer(key):
+    warm = WarmRecognizer(*key)
+    return warm if warm.recognizer is not None else None
+
+
+recognizer_pool = ResourcePool("recognizer", _create_warm_recognizer, WarmRecognizer.close)
+
+
+def _on_config_change(changed):
+    # A recognizer kept warm in this process is dead weight once recognition moves to the worker.
+    if "process_pipeline" in changed and cfg.process_pipeline:
+        recognizer_pool.clear()
+
+
+cfg.add_listener(_on_config_change)
+
+
+class RecognizerWarmup:
+    def __init__(self):
+        self.ready = threading.Event()
+        self.error = None
+        self._thread = None
+
+    def start(self, on_ready=None):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(on_ready,), name="RecognizerWarmup", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self, on_ready):
+        try:
+            if cfg.process_pipeline:
+                for module_name in PREVIEW_MODULES:
+                    startup_timer.timed_import(module_name)
+                startup_timer.mark("preview modules imported")
+            else:
+                for module_name in PIPELINE_MODULES:
+                    startup_timer.timed_import(module_name)
+                startup_timer.mark("pipeline modules imported")
+                key = recognizer_key(cfg.live_stream_mode)
+                recognizer_pool.release(key, recognizer_pool.acquire(key))
+                startup_timer.mark("recognizer loaded and warmed up")
+        except Exception as e:
+            self.error = e
+            print(f"Recognizer warm-up failed: {e}")
+        finally:
+            self.ready.set()
+        if on_ready is not None:
+            on_ready()
+
+    def wait(self, timeout=None):
+        # A recognizer that is still warming up is worth waiting for, loading a second copy is slower.
+        if self._thread is not None:
+            self.ready.wait(timeout)
+
+
+recognizer_warmup = RecognizerWarmup()
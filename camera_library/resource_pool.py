@@ -0,0 +1,82 @@
+import threading
+
+
+class ResourcePool:
+    # Keeps released instances warm for reuse. Instances are keyed by the options they were
+    # created with, an idle instance whose key no longer matches is closed, not kept around.
+    def __init__(self, name, factory, close, idle_timeout=None):
+        self.name = name
+        self.factory = factory
+        self.close_instance = close
+        self.idle_timeout = idle_timeout
+        self.created = 0
+        self.reused = 0
+        self.closed = 0
+        self._lock = threading.Lock()
+        self._idle = {}
+
+    def acquire(self, key):
+        with self._lock:
+            entry = self._idle.pop(key, None)
+            stale = [self._idle.pop(other) for other in list(self._idle)]
+        for instance, timer in stale:
+            self._close(instance, timer)
+        if entry is not None:
+            instance, timer = entry
+            if timer is not None:
+                timer.cancel()
+            self.reused += 1
+            return instance
+
+        instance = self.factory(key)
+        if instance is not None:
+            self.created += 1
+        return instance
+
+    def release(self, key, instance):
+        if instance is None:
+            return
+        idle_timeout = self.idle_timeout() if callable(self.idle_timeout) else self.idle_timeout
+        if idle_timeout is not None and idle_timeout <= 0:
+            self._close(instance, None)
+            return
+        timer = None
+        if idle_timeout is not None:
+            timer = threading.Timer(idle_timeout, self._expire, args=(key, instance))
+            timer.daemon = True
+        with self._lock:
+            previous = self._idle.pop(key, None)
+            self._idle[key] = (instance, timer)
+        if previous is not None:
+            self._close(*previous)
+        if timer is not None:
+            timer.start()
+
+    def _expire(self, key, instance):
+        with self._lock:
+            entry = self._idle.get(key)
+            if entry is None or entry[0] is not instance:
+                return
+            del self._idle[key]
+        self._close(instance, None)
+
+    def _close(self, instance, timer):
+        if timer is not None:
+            timer.cancel()
+        try:
+            self.close_instance(instance)
+        except Exception as e:
+            print(f"Error closing pooled {self.name}: {e}")
+        self.closed += 1
+
+    def clear(self):
+        with self._lock:
+            entries = list(self._idle.values())
+            self._idle.clear()
+        for instance, timer in entries:
+            self._close(instance, timer)
+
+    def stats(self):
+        with self._lock:
+            idle = len(self._idle)
+        return {"idle": idle, "created": self.created, "reused": self.reused, "closed": self.closed}
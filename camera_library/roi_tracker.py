@@ -0,0 +1,73 @@
+class RoiTracker:
+    def __init__(self, padding=0.6, min_size=320, full_frame_interval=30):
+        self.padding = padding
+        self.min_size = min_size
+        self.full_frame_interval = full_frame_interval
+        self.last_box = None
+        self.frames_since_full = 0
+        self.roi_frames = 0
+        self.full_frames = 0
+
+    def region(self, frame_width, frame_height):
+        # Periodic full-frame passes let a second hand entering the scene be picked up.
+        if self.last_box is None or self.frames_since_full >= self.full_frame_interval:
+            return None
+
+        min_x, min_y, max_x, max_y = self.last_box
+        box_w = (max_x - min_x) * frame_width
+        box_h = (max_y - min_y) * frame_height
+        size = max(box_w, box_h) * (1.0 + 2.0 * self.padding)
+        size = max(size, self.min_size)
+        roi_w = int(min(size, frame_width))
+        roi_h = int(min(size, frame_height))
+
+        center_x = (min_x + max_x) / 2 * frame_width
+        center_y = (min_y + max_y) / 2 * frame_height
+        x1 = int(max(0, min(center_x - roi_w / 2, frame_width - roi_w)))
+        y1 = int(max(0, min(center_y - roi_h / 2, frame_height - roi_h)))
+        if roi_w >= frame_width and roi_h >= frame_height:
+            return None
+        return x1, y1, x1 + roi_w, y1 + roi_h
+
+    def crop(self, frame, roi):
+        if roi is None:
+            return frame
+        x1, y1, x2, y2 = roi
+        return frame[y1:y2, x1:x2]
+
+    def update(self, recognition_result, roi, frame_width, frame_height):
+        landmarks_list = recognition_result.hand_landmarks if recognition_result else None
+
+        if roi is None:
+            self.frames_since_full = 0
+            self.full_frames += 1
+        else:
+            self.frames_since_full += 1
+            self.roi_frames += 1
+            if landmarks_list:
+                self._map_to_frame(landmarks_list, roi, frame_width, frame_height)
+
+        if not landmarks_list:
+            # Tracking lost, the next frame is searched in full.
+            self.last_box = None
+            return
+
+        xs = [lm.x for hand in landmarks_list for lm in hand]
+        ys = [lm.y for hand in landmarks_list for lm in hand]
+        self.last_box = (min(xs), min(ys), max(xs), max(ys))
+
+    def _map_to_frame(self, landmarks_list, roi, frame_width, frame_height):
+        x1, y1, x2, y2 = roi
+        scale_x = (x2 - x1) / frame_width
+        scale_y = (y2 - y1) / frame_height
+        offset_x = x1 / frame_width
+        offset_y = y1 / frame_height
+        for hand in landmarks_list:
+            for lm in hand:
+                lm.x = offset_x + lm.x * scale_x
+                lm.y = offset_y + lm.y * scale_y
+                if getattr(lm, "z", None) is not None:
+                    lm.z = lm.z * scale_x
+
+    def stats(self):
+        return {"roi_frames": self.roi_frames, "full_frames": self.full_frames}
@@ -0,0 +1,194 @@
+import copy
+import json
+import os
+import tempfile
+import threading
+from configuration.configuration import cfg, configuration_file_path, current_dir
+
+
+def write_json_atomic(path, data):
+    # Write to a temp file next to the target and rename it over, a reader never sees half a file.
+    text = json.dumps(data, indent=4, ensure_ascii=False)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return text
+
+
+class DebouncedJsonWriter:
+    def __init__(self, path, delay=0.5):
+        self.path = path
+        self.delay = delay
+        self.last_written = None
+        self.writes = 0
+        self._lock = threading.Lock()
+        self._data = None
+        self._timer = None
+
+    def schedule(self, data):
+        # Every call restarts the timer, a burst of changes ends up as one write.
+        with self._lock:
+            self._data = copy.deepcopy(data)
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            data = self._data
+            self._data = None
+            if data is None:
+                return
+            try:
+                self.last_written = write_json_atomic(self.path, data)
+                self.writes += 1
+            except Exception as e:
+                print(f"Error saving {os.path.basename(self.path)}: {e}")
+
+    def write_now(self, data):
+        self.schedule(data)
+        self.flush()
+
+    def pending(self):
+        with self._lock:
+            return copy.deepcopy(self._data)
+
+
+class JsonFileWatcher:
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.running = False
+        self._watches = []
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def watch(self, path, callback, writer=None):
+        self._watches.append([path, callback, writer, self._stat(path)])
+        return self
+
+    def _stat(self, path):
+        try:
+            st = os.stat(path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self.running = True
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="JsonFileWatcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            for watch in self._watches:
+                path, callback, writer, last_stat = watch
+                current = self._stat(path)
+                if current is None or current == last_stat:
+                    continue
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        text = f.read()
+                    data = json.loads(text)
+                except (OSError, ValueError):
+                    # Probably caught an editor halfway through saving, retry on the next poll.
+                    continue
+                watch[3] = current
+                if writer is not None and text == writer.last_written:
+                    continue
+                try:
+                    callback(data)
+                except Exception as e:
+                    print(f"Error reloading {os.path.basename(path)}: {e}")
+
+    def stop(self):
+        self.running = False
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1.0)
+            self._thread = None
+
+
+def _load_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+ASSIGNMENTS_FILE = os.path.join(current_dir, "function_assigne", "function_assigne.json")
+
+settings_writer = DebouncedJsonWriter(configuration_file_path)
+assignments_writer = DebouncedJsonWriter(ASSIGNMENTS_FILE)
+
+
+def load_settings():
+    # Settings that are still waiting for their debounced write win over the file.
+    pending = settings_writer.pending()
+    if pending is not None:
+        return pending
+    return _load_json(configuration_file_path)
+
+
+def add_gesture_keys(gesture_names):
+    # Gestures a trained classifier knows become assignable for both hands, unassigned.
+    data = _load_json(ASSIGNMENTS_FILE)
+    if not isinstance(data, list):
+        return []
+    added = []
+    for entry in data:
+        functions = entry.setdefault("functions", [{}])[0]
+        for name in gesture_names:
+            if name not in functions:
+                functions[name] = "None"
+                if name not in added:
+                    added.append(name)
+    if added:
+        assignments_writer.write_now(data)
+    return added
+
+
+def start_config_watcher(on_settings=None, on_assignments=None, interval=1.0):
+    last_settings = [_load_json(configuration_file_path)]
+
+    def reload_settings(data):
+        # Only keys that changed in the file are applied, runtime state such as an active
+        # speed boost is not reset by an unrelated edit.
+        changed = {key: value for key, value in data.items() if last_settings[0].get(key) != value}
+        last_settings[0] = data
+        for key, value in changed.items():
+            if hasattr(cfg, key) and not key.startswith("_"):
+                cfg.update(key, value)
+        if changed and on_settings is not None:
+            on_settings(changed)
+
+    def reload_assignments(data):
+        # Imported here, the dispatch code pulls in the input libraries and is not needed at startup.
+        import configuration.function_assigne.function_configuration as func_config
+        func_config.reload_assignments()
+        if on_assignments is not None:
+            on_assignments(data)
+
+    watcher = JsonFileWatcher(interval)
+    watcher.watch(configuration_file_path, reload_settings, settings_writer)
+    watcher.watch(ASSIGNMENTS_FILE, reload_assignments, assignments_writer)
+    return watcher.start()
@@ -1,9 +1,10 @@
-import mediapipe as mp
-import cv2
 import json
 import os
+import threading
+import time
+from types import MappingProxyType, SimpleNamespace
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 
 current_dir = os.path.dirname(os.path.abspath(__file__))
 configuration_file_path = os.path.join(current_dir, 'configuration.json')
@@ -17,6 +18,8 @@ except:
 class Config:
     cursor_speed: int = settings.get("cursor_speed", 20)
     _main_hand: str = field(default=settings.get("main_hand", "Right"), init=False)
+    cursor_output_hz: int = settings.get("cursor_output_hz", 200)
+    cursor_reference_fps: float = settings.get("cursor_reference_fps", 30.0)
     default_cursor_speed: int = settings.get("default_cursor_speed", 20)
     speed_boost_factor: float = settings.get("speed_boost_factor", 2.0)
     scroll_speed: int = settings.get("scroll_speed", 25)
@@ -28,22 +31,137 @@ class Config:
     camera_height_crop: int = settings.get("camera_height_crop", 300)
     last_click_time: float = settings.get("last_click_time", 0.0)
     camera_index: int = settings.get("camera_index", 0)
+    camera_idle_timeout: float = settings.get("camera_idle_timeout", 30.0)
+    camera_fps: float = settings.get("camera_fps", 30.0)
+    camera_fourcc: str = settings.get("camera_fourcc", "auto")
+    camera_buffer_size: int = settings.get("camera_buffer_size", 1)
     font_scale: float = settings.get("font_scale", 1.0)
     thickness: int = settings.get("thickness", 2)
     debug_mode: bool = settings.get("debug_mode", False)
+    event_log: bool = settings.get("event_log", False)
+    event_log_path: str = settings.get("event_log_path", os.path.join("logs", "events.jsonl"))
+    event_log_max_bytes: int = settings.get("event_log_max_bytes", 5 * 1024 * 1024)
+    event_log_backups: int = settings.get("event_log_backups", 3)
+    debug_capture_mode: str = settings.get("debug_capture_mode", "images")
+    debug_capture_dir: str = settings.get("debug_capture_dir", "debug_images")
+    debug_buffer_seconds: float = settings.get("debug_buffer_seconds", 10.0)
+    debug_buffer_fps: float = settings.get("debug_buffer_fps", 15.0)
+    live_stream_mode: bool = settings.get("live_stream_mode", False)
+    process_pipeline: bool = settings.get("process_pipeline", False)
+    frame_source: str = settings.get("frame_source", "camera")
+    frame_source_path: str = settings.get("frame_source_path", "")
+    frame_source_fps: float = settings.get("frame_source_fps", 30.0)
+    frame_source_realtime: bool = settings.get("frame_source_realtime", True)
+    record_landmarks: bool = settings.get("record_landmarks", False)
+    recording_dir: str = settings.get("recording_dir", "recordings")
+    record_label: str = settings.get("record_label", "")
+    async_actions: bool = settings.get("async_actions", True)
+    preview_enabled: bool = settings.get("preview_enabled", True)
+    preview_fps: float = settings.get("preview_fps", 30.0)
+    metrics_overlay: bool = settings.get("metrics_overlay", False)
+    landmark_filter: str = settings.get("landmark_filter", "none")
+    filter_min_cutoff: float = settings.get("filter_min_cutoff", 1.5)
+    filter_beta: float = settings.get("filter_beta", 5.0)
+    filter_d_cutoff: float = settings.get("filter_d_cutoff", 1.0)
+    kalman_process_noise: float = settings.get("kalman_process_noise", 50.0)
+    kalman_measurement_noise: float = settings.get("kalman_measurement_noise", 1e-5)
+    idle_mode: bool = settings.get("idle_mode", True)
+    idle_after: float = settings.get("idle_after", 5.0)
+    idle_fps: float = settings.get("idle_fps", 4.0)
+    idle_scale: float = settings.get("idle_scale", 0.5)
+    idle_motion_threshold: float = settings.get("idle_motion_threshold", 6.0)
+    keyframe_interval: int = settings.get("keyframe_interval", 1)
+    keyframe_min_tracked: float = settings.get("keyframe_min_tracked", 0.8)
+    keyframe_max_fb_error: float = settings.get("keyframe_max_fb_error", 1.5)
+    roi_tracking: bool = settings.get("roi_tracking", False)
+    roi_padding: float = settings.get("roi_padding", 0.6)
+    roi_min_size: int = settings.get("roi_min_size", 320)
+    roi_full_frame_interval: int = settings.get("roi_full_frame_interval", 30)
+    gesture_enter_delay: float = settings.get("gesture_enter_delay", 0.1)
+    gesture_release_delay: float = settings.get("gesture_release_delay", 0.15)
+    gesture_hold_hz: float = settings.get("gesture_hold_hz", 5.0)
+    gesture_classifier: str = settings.get("gesture_classifier", "rules")
+    gesture_model_path: str = settings.get("gesture_model_path", os.path.join("models", "gesture_model.npz"))
+    gesture_model_min_confidence: float = settings.get("gesture_model_min_confidence", 0.6)
     custom_hotkeys: dict = field(default_factory=lambda: settings.get("custom_hotkeys", {}))
     
     MODEL_FILENAME: str = os.path.join(current_dir, "gesture_recognizer.task")
-    font: int = cv2.FONT_HERSHEY_SIMPLEX
-    
-    mp_drawing = mp.solutions.drawing_utils
-    mp_hands = mp.solutions.hands
+    # cv2.FONT_HERSHEY_SIMPLEX, the value is inlined so importing the config does not load OpenCV.
+    font: int = 0
     
     off_hand: str = field(init=False)
+    version: int = field(default=0, init=False)
 
     def __post_init__(self):
         self._main_hand = settings.get("main_hand", "Right")
         self._update_off_hand()
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._listeners = []
+        self._loops = 0
+
+    def update(self, key, value):
+        # While a recognition loop is registered, changes are applied by its next begin_frame() so
+        # a frame never sees half of an update. Without a loop they are applied right away.
+        with self._lock:
+            self._pending[key] = value
+            staged = self._loops > 0
+        if not staged:
+            self.apply_pending()
+
+    def apply_pending(self):
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+            changed = set()
+            for key, value in pending.items():
+                if getattr(self, key, None) != value:
+                    setattr(self, key, value)
+                    changed.add(key)
+            if changed:
+                self.version += 1
+            listeners = list(self._listeners)
+        if changed:
+            for listener in listeners:
+                try:
+                    listener(changed)
+                except Exception as e:
+                    print(f"Config listener failed: {e}")
+        return changed
+
+    def add_listener(self, listener):
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def begin_loop(self):
+        # Called by a recognition loop before its first begin_frame(), end_loop() when it stops.
+        with self._lock:
+            self._loops += 1
+
+    def end_loop(self):
+        with self._lock:
+            self._loops = max(self._loops - 1, 0)
+        self.apply_pending()
+
+    def begin_frame(self):
+        # Applies the staged changes and returns the snapshot the whole frame is processed with.
+        if self._pending:
+            self.apply_pending()
+        return self.snapshot()
+
+    def snapshot(self):
+        # A read-only copy of every setting, for code that must not see a change halfway through.
+        # Taken under the lock apply_pending() holds, so main_hand and off_hand always match.
+        with self._lock:
+            values = {f.name: getattr(self, f.name) for f in fields(self) if not f.name.startswith("_")}
+            values["main_hand"] = self._main_hand
+            values["custom_hotkeys"] = MappingProxyType(dict(self.custom_hotkeys))
+        return ConfigSnapshot(values)
     
     @property
     def main_hand(self):
@@ -60,4 +178,15 @@ class Config:
         else:
             self.off_hand = "Right"
 
+class ConfigSnapshot(SimpleNamespace):
+    def __setattr__(self, name, value):
+        raise AttributeError("ConfigSnapshot is read-only, use cfg.update() to change a setting")
+
+    def __delattr__(self, name):
+        raise AttributeError("ConfigSnapshot is read-only")
+
+    def __init__(self, values):
+        self.__dict__.update(values)
+
+
 cfg = Config()
\ No newline at end of file
@@ -1,6 +1,8 @@
 import json
+from functools import partial
 from pathlib import Path
 from configuration.configuration import cfg
+from configuration.config_persistence import settings_writer, load_settings
 from function_library.trigerable_functions import (
     click_func,
     right_click_func,
@@ -20,6 +22,8 @@ from function_library.trigerable_functions import (
     maximize_window,
     double_click_func,
 )
+from function_library.action_executor import action_executor
+from diagnostics_library.event_log import event_log
 
 FUNC_FILE = Path(__file__).with_name("function_assigne.json")
 
@@ -27,87 +31,206 @@ def load_func_assignments():
     with FUNC_FILE.open("r", encoding="utf-8") as f:
         raw = json.load(f)
         return {entry["hand"]: entry["functions"][0] for entry in raw}
-    
+
+def _click():
+    cfg.last_click_time = click_func(cfg.last_click_time)
+    return False
+
+def _right_click():
+    cfg.last_click_time = right_click_func(cfg.last_click_time)
+    return False
+
+def _apply_boost():
+    apply_speed_boost()
+    return True
+
+def _scroll_up(steps=1):
+    update_scrolling(1, steps)
+    return False
+
+def _scroll_down(steps=1):
+    update_scrolling(-1, steps)
+    return False
+
+def _volume_up(steps=1):
+    volume_up(steps)
+    return False
+
+def _volume_down(steps=1):
+    volume_down(steps)
+    return False
+
+def _toggle_mute():
+    toggle_mute()
+    return False
+
+def _voice_assistant():
+    launch_voice_assistant()
+    return False
+
+def _osk():
+    open_on_screen_keyboard()
+    return False
+
+def _next_song():
+    cfg.last_click_time = next_song(cfg.last_click_time)
+    return False
+
+def _previous_song():
+    cfg.last_click_time = previous_song(cfg.last_click_time)
+    return False
+
+def _play_pause_music():
+    cfg.last_click_time = play_pause_music(cfg.last_click_time)
+    return False
+
+def _double_click():
+    cfg.last_click_time = double_click_func(cfg.last_click_time)
+    return False
+
+def _minimize_window():
+    cfg.last_click_time = minimize_window(cfg.last_click_time)
+    return False
+
+def _maximize_window():
+    cfg.last_click_time = maximize_window(cfg.last_click_time)
+    return False
+
+def _press_hotkey(key):
+    cfg.last_click_time = press_custom_key(key, cfg.last_click_time)
+    return False
+
+FUNCTIONS = {
+    "click_func": _click,
+    "right_click_func": _right_click,
+    "apply_boost": _apply_boost,
+    "update_scrolling up": _scroll_up,
+    "update_scrolling down": _scroll_down,
+    "volume_up": _volume_up,
+    "volume_down": _volume_down,
+    "toggle_mute": _toggle_mute,
+    "voice_assistant": _voice_assistant,
+    "osk": _osk,
+    "next_song": _next_song,
+    "previous_song": _previous_song,
+    "play_pause_music": _play_pause_music,
+    "double_click_func": _double_click,
+    "minimize_window": _minimize_window,
+    "maximize_window": _maximize_window,
+}
+
+# Run on the recognition thread: they only touch in-process state and their result is needed right away.
+SYNC_FUNCTIONS = {"apply_boost"}
+# Repeated requests are summed into one call with a step count.
+STEP_FUNCTIONS = {"update_scrolling up", "update_scrolling down", "volume_up", "volume_down"}
+
+# Gesture events an action fires on. "enter" fires once when a gesture starts, "hold" repeats
+# at gesture_hold_hz while it is held, "release" fires when it ends and "active" on every frame.
+DEFAULT_EVENTS = frozenset({"enter"})
+EVENT_BINDINGS = {
+    "apply_boost": frozenset({"active"}),
+    "update_scrolling up": frozenset({"enter", "hold"}),
+    "update_scrolling down": frozenset({"enter", "hold"}),
+    "volume_up": frozenset({"enter", "hold"}),
+    "volume_down": frozenset({"enter", "hold"}),
+}
+
+def _submit_action(func_name, action, accumulate):
+    action_executor.submit(func_name, action, accumulate)
+    return False
+
+def resolve_action(func_name):
+    if func_name.startswith("custom_hotkey:"):
+        hotkey_name = func_name.split(":", 1)[1]
+        key = cfg.custom_hotkeys.get(hotkey_name)
+        if not key:
+            return None
+        return partial(_press_hotkey, key)
+    return FUNCTIONS.get(func_name)
+
+def compile_dispatch_table(assignments):
+    # Keyed by (hand role, gesture name) so a gesture event costs a single dict lookup. The role
+    # of a hand label comes from the config of the frame, see _hand_key().
+    table = {}
+    for hand_key in ("Main", "Secondary"):
+        for gesture_key, func_name in assignments.get(hand_key, {}).items():
+            if not func_name or func_name == "None":
+                continue
+            action = resolve_action(func_name)
+            if action is None:
+                if func_name.startswith("custom_hotkey:"):
+                    # Assigned before its key was recorded, it works once the hotkey is registered.
+                    if cfg.debug_mode:
+                        print(f"Custom hotkey '{func_name.split(':', 1)[1]}' not found in configuration.")
+                else:
+                    print(f"Unknown function '{func_name}' assigned to {hand_key} hand gesture '{gesture_key}', ignoring it.")
+                continue
+            if cfg.async_actions and func_name not in SYNC_FUNCTIONS:
+                action = partial(_submit_action, func_name, action, func_name in STEP_FUNCTIONS)
+            events = EVENT_BINDINGS.get(func_name, DEFAULT_EVENTS)
+            table[(hand_key, gesture_key)] = (func_name, action, events)
+    return table
+
+def rebuild_dispatch_table():
+    global dispatch_table
+    dispatch_table = compile_dispatch_table(assignments)
+
+def reload_assignments():
+    global assignments
+    assignments = load_func_assignments()
+    rebuild_dispatch_table()
+
+def _on_config_change(changed):
+    if changed & {"async_actions", "custom_hotkeys"}:
+        rebuild_dispatch_table()
+
 assignments = load_func_assignments()
+dispatch_table = compile_dispatch_table(assignments)
+cfg.add_listener(_on_config_change)
 
-def _resolve_hand_key(hand_label):
-    if hand_label == cfg.main_hand:
+def _hand_key(hand_label, config):
+    if hand_label == config.main_hand:
         return "Main"
-    if hand_label == cfg.off_hand:
+    if hand_label == config.off_hand:
         return "Secondary"
     return None
 
-def select_and_call_func(gesture, hand_label, finger_gesture_text=""):
-    hand_key = _resolve_hand_key(hand_label)
-    if hand_key is None:
-        return False
+def _gesture_key(gesture, finger_gesture_text):
+    return finger_gesture_text or (getattr(gesture, "category_name", "") if gesture else "")
+
+def resolve_func_name(gesture, hand_label, finger_gesture_text="", config=cfg):
+    entry = dispatch_table.get((_hand_key(hand_label, config), _gesture_key(gesture, finger_gesture_text)))
+    if entry is None:
+        return None
+    return entry[0]
 
-    gesture_key = finger_gesture_text or (getattr(gesture, "category_name", "") if gesture else "")
-    if not gesture_key:
+def resolve_event_func_name(hand_label, gesture_key, kind, config=cfg):
+    entry = dispatch_table.get((_hand_key(hand_label, config), gesture_key))
+    if entry is None or kind not in entry[2]:
+        return None
+    return entry[0]
+
+def dispatch_gesture_event(hand_label, gesture_key, kind, config=cfg):
+    entry = dispatch_table.get((_hand_key(hand_label, config), gesture_key))
+    if entry is None or kind not in entry[2]:
         return False
+    if kind != "active":
+        event_log.log("action", hand_label, gesture_key, None, entry[0], kind)
+    return entry[1]()
 
-    hand_mapping = assignments.get(hand_key, {})
-    func_name = hand_mapping.get(gesture_key)
-    if not func_name or func_name == "None":
+def select_and_call_func(gesture, hand_label, finger_gesture_text="", config=cfg):
+    # Calls the action regardless of its event binding, for callers without a gesture tracker.
+    entry = dispatch_table.get((_hand_key(hand_label, config), _gesture_key(gesture, finger_gesture_text)))
+    if entry is None:
         return False
 
-    return call_function(func_name)
+    return entry[1]()
 
 def call_function(func_name):
-    if func_name == "click_func":
-        cfg.last_click_time = click_func(cfg.last_click_time)
-        return False
-    elif func_name == "right_click_func":
-        cfg.last_click_time = right_click_func(cfg.last_click_time)
-        return False
-    elif func_name == "apply_boost":
-        apply_speed_boost()
-        return True
-    elif func_name == "update_scrolling up":
-        update_scrolling(1)
-        return False
-    elif func_name == "update_scrolling down":
-        update_scrolling(-1)
-        return False
-    elif func_name == "volume_up":
-        volume_up()
-        return False
-    elif func_name == "volume_down":
-        volume_down()
-        return False
-    elif func_name == "toggle_mute":
-        toggle_mute()
-        return False
-    elif func_name == "voice_assistant":
-        launch_voice_assistant()
-        return False
-    elif func_name == "osk":
-        open_on_screen_keyboard()
-        return False
-    elif func_name == "next_song":
-        cfg.last_click_time = next_song(cfg.last_click_time)
-        return False
-    elif func_name == "previous_song":
-        cfg.last_click_time = previous_song(cfg.last_click_time)
-        return False
-    elif func_name == "play_pause_music":
-        cfg.last_click_time = play_pause_music(cfg.last_click_time)
-        return False
-    elif func_name == "double_click_func":
-        cfg.last_click_time = double_click_func(cfg.last_click_time)
-        return False
-    elif func_name == "minimize_window":
-        cfg.last_click_time = minimize_window(cfg.last_click_time)
-        return False
-    elif func_name == "maximize_window":
-        cfg.last_click_time = maximize_window(cfg.last_click_time)
-        return False
-    elif func_name.startswith("custom_hotkey:"):
-        hotkey_name = func_name.split(":", 1)[1]
-        register_or_execute_custom_hotkey(hotkey_name)
-        return False
-    else:
+    action = resolve_action(func_name)
+    if action is None:
         return False
+    return action()
 
 
 def register_or_execute_custom_hotkey(hotkey_name):
@@ -124,22 +247,8 @@ def register_or_execute_custom_hotkey(hotkey_name):
 
 
 def _save_custom_hotkeys():
-    try:
-        config_path = Path(__file__).parent.parent / "configuration.json"
-        
-        if config_path.exists():
-            with open(config_path, "r", encoding="utf-8") as f:
-                config_data = json.load(f)
-        else:
-            config_data = {}
-        
-        config_data["custom_hotkeys"] = cfg.custom_hotkeys
-        
-        with open(config_path, "w", encoding="utf-8") as f:
-            json.dump(config_data, f, indent=4, ensure_ascii=False)
-        
-        if cfg.debug_mode:
-            print("Custom hotkeys saved to configuration.json")
-    except Exception as e:
-        if cfg.debug_mode:
-            print(f"Error saving custom hotkeys: {e}")
\ No newline at end of file
+    config_data = load_settings()
+    config_data["custom_hotkeys"] = dict(cfg.custom_hotkeys)
+    settings_writer.schedule(config_data)
+    if cfg.debug_mode:
+        print("Custom hotkeys saved to configuration.json")
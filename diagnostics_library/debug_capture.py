@@ -0,0 +1,164 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+import cv2
+import numpy as np
+from configuration.configuration import cfg
+
+
+class DebugCapture:
+    def __init__(self, max_queue=8):
+        self.max_queue = max_queue
+        self.running = False
+        self.written_images = 0
+        self.buffered_frames = 0
+        self.dropped_frames = 0
+        self.dumps = 0
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._events = deque()
+        self._last_frame_time = 0.0
+        self._ring = deque()
+        self._created_dirs = set()
+        self._thread = None
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self.running = True
+            self._thread = threading.Thread(target=self._run, name="DebugCapture", daemon=True)
+            self._thread.start()
+
+    def _put(self, item, droppable=True):
+        # Frames are dropped rather than queued without bound, the recognition thread never waits on disk.
+        with self._cond:
+            if droppable and len(self._queue) >= self.max_queue:
+                self.dropped_frames += 1
+                return False
+            self._queue.append(item)
+            self._ensure_started()
+            self._cond.notify()
+            return True
+
+    def submit_image(self, path, frame, overlay=None):
+        return self._put(("image", path, frame.copy(), overlay))
+
+    def add_frame(self, frame, timestamp=None, overlay=None):
+        if timestamp is None:
+            timestamp = time.time()
+        if cfg.debug_buffer_fps > 0 and timestamp - self._last_frame_time < 1.0 / cfg.debug_buffer_fps:
+            return False
+        self._last_frame_time = timestamp
+        return self._put(("frame", timestamp, frame.copy(), overlay))
+
+    def add_event(self, text, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time()
+        with self._cond:
+            self._events.append((timestamp, text))
+            self._trim(self._events, timestamp)
+
+    def dump(self, directory=None):
+        return self._put(("dump", directory or cfg.debug_capture_dir, None, None), droppable=False)
+
+    def _trim(self, buffer, now):
+        while buffer and now - buffer[0][0] > cfg.debug_buffer_seconds:
+            buffer.popleft()
+
+    def _ensure_dir(self, directory):
+        if directory and directory not in self._created_dirs:
+            os.makedirs(directory, exist_ok=True)
+            self._created_dirs.add(directory)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or not self.running)
+                if not self._queue:
+                    return
+                kind, arg, frame, overlay = self._queue.popleft()
+            try:
+                if overlay is not None:
+                    frame = overlay.render_mirrored(frame)
+                if kind == "image":
+                    self._ensure_dir(os.path.dirname(arg))
+                    cv2.imwrite(arg, frame, [cv2.IMWRITE_JPEG_QUALITY, 50])
+                    self.written_images += 1
+                elif kind == "frame":
+                    # Frames are kept JPEG-encoded so the buffer holds seconds of video in a few MB.
+                    ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 70])
+                    if ok:
+                        self._ring.append((arg, encoded))
+                        self._trim(self._ring, arg)
+                        self.buffered_frames = len(self._ring)
+                else:
+                    self._write_segment(arg)
+            except Exception as e:
+                print(f"Debug capture failed to write {kind}: {e}")
+
+    def _write_segment(self, directory):
+        frames = list(self._ring)
+        with self._cond:
+            events = list(self._events)
+        if not frames:
+            print("Debug capture buffer is empty, nothing to save.")
+            return
+
+        self._ensure_dir(directory)
+        base = os.path.join(directory, "segment_" + time.strftime("%Y%m%d_%H%M%S"))
+        first = cv2.imdecode(frames[0][1], cv2.IMREAD_COLOR)
+        h, w = first.shape[:2]
+        duration = frames[-1][0] - frames[0][0]
+        fps = (len(frames) - 1) / duration if duration > 0 else max(1.0, cfg.debug_buffer_fps)
+        writer = cv2.VideoWriter(base + ".mp4", cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+        try:
+            for _, encoded in frames:
+                image = cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+                if image.shape[:2] != (h, w):
+                    image = cv2.resize(image, (w, h))
+                writer.write(image)
+        finally:
+            writer.release()
+
+        timestamps = np.array([timestamp for timestamp, _ in frames])
+        index = {
+            "video": os.path.basename(base + ".mp4"),
+            "fps": fps,
+            "start_time": float(timestamps[0]),
+            "frame_times": [round(float(t - timestamps[0]), 4) for t in timestamps],
+            "events": [
+                {
+                    "time": round(timestamp - float(timestamps[0]), 4),
+                    "frame": int(min(np.searchsorted(timestamps, timestamp), len(timestamps) - 1)),
+                    "text": text,
+                }
+                for timestamp, text in events
+                if timestamp >= timestamps[0]
+            ],
+        }
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2)
+        self.dumps += 1
+        print(f"Debug segment saved to {base}.mp4 ({len(frames)} frames, {len(index['events'])} events)")
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queued": len(self._queue),
+                "images": self.written_images,
+                "buffered": self.buffered_frames,
+                "dropped": self.dropped_frames,
+                "dumps": self.dumps,
+            }
+
+    def stop(self, timeout=2.0):
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+
+debug_capture = DebugCapture()
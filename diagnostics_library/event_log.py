@@ -0,0 +1,127 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from configuration.configuration import cfg
+
+FIELDS = ("hand", "gesture", "score", "action", "detail")
+
+
+class EventLog:
+    def __init__(self, max_queue=4096, flush_interval=0.5):
+        self.max_queue = max_queue
+        self.flush_interval = flush_interval
+        self.running = False
+        self.frame_id = 0
+        self.written_events = 0
+        self.dropped_events = 0
+        self.rotations = 0
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._file = None
+        self._path = None
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return cfg.event_log or cfg.debug_mode
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self.running = True
+            self._thread = threading.Thread(target=self._run, name="EventLog", daemon=True)
+            self._thread.start()
+
+    def next_frame(self):
+        self.frame_id += 1
+        return self.frame_id
+
+    def log(self, kind, hand=None, gesture=None, score=None, action=None, detail=None):
+        # Only a tuple is queued here, formatting and file I/O happen on the writer thread.
+        if not self.enabled:
+            return
+        item = (time.monotonic(), self.frame_id, kind, hand, gesture, score, action, detail)
+        with self._cond:
+            if len(self._queue) >= self.max_queue:
+                self.dropped_events += 1
+                return
+            self._queue.append(item)
+            self._ensure_started()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # Wake up periodically rather than per event so writes go out in batches.
+                self._cond.wait_for(lambda: not self.running, timeout=self.flush_interval)
+                batch = list(self._queue)
+                self._queue.clear()
+                running = self.running
+            if batch:
+                try:
+                    self._write(batch)
+                except Exception as e:
+                    print(f"Event log write failed: {e}")
+            if not running:
+                self._close_file()
+                return
+
+    def _write(self, batch):
+        f = self._open_file()
+        for timestamp, frame_id, kind, *values in batch:
+            record = {"t": round(timestamp, 4), "frame": frame_id, "kind": kind}
+            for name, value in zip(FIELDS, values):
+                if value is not None:
+                    record[name] = round(value, 3) if isinstance(value, float) else value
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        f.flush()
+        self.written_events += len(batch)
+        if f.tell() >= cfg.event_log_max_bytes:
+            self._rotate()
+
+    def _open_file(self):
+        if self._file is None or self._path != cfg.event_log_path:
+            self._close_file()
+            self._path = cfg.event_log_path
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self._path, "a", encoding="utf-8")
+        return self._file
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _rotate(self):
+        self._close_file()
+        backups = max(0, cfg.event_log_backups)
+        for i in range(backups - 1, 0, -1):
+            if os.path.exists(f"{self._path}.{i}"):
+                os.replace(f"{self._path}.{i}", f"{self._path}.{i + 1}")
+        if backups > 0:
+            os.replace(self._path, f"{self._path}.1")
+        else:
+            os.remove(self._path)
+        self.rotations += 1
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queued": len(self._queue),
+                "written": self.written_events,
+                "dropped": self.dropped_events,
+                "rotations": self.rotations,
+            }
+
+    def stop(self, timeout=2.0):
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+
+event_log = EventLog()
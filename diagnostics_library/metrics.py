@@ -0,0 +1,124 @@
+import bisect
+import threading
+import time
+
+# Log-spaced bucket upper bounds from 0.1 ms to roughly 10 s.
+BUCKET_EDGES_MS = [0.1 * (2 ** (i / 2)) for i in range(34)]
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(BUCKET_EDGES_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, seconds):
+        ms = seconds * 1000.0
+        self.counts[bisect.bisect_left(BUCKET_EDGES_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, q):
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return BUCKET_EDGES_MS[i] if i < len(BUCKET_EDGES_MS) else self.max_ms
+        return self.max_ms
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": self.max_ms,
+        }
+
+
+class PipelineMetrics:
+    STAGES = ("capture_to_action", "inference", "tracking", "landmark_filter", "post_processing", "actuation", "action_latency")
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.latest = None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {stage: LatencyHistogram() for stage in self.STAGES}
+            self.window_frames = 0
+            self.total_frames = 0
+            self.dropped_frames = 0
+            self.gauges = {}
+            self._window_start = time.monotonic()
+            self.latest = None
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self.histograms[stage].record(seconds)
+
+    def frame_done(self, arrival_time=None):
+        now = time.monotonic()
+        with self._lock:
+            self.window_frames += 1
+            self.total_frames += 1
+            if arrival_time is not None:
+                self.histograms["capture_to_action"].record(now - arrival_time)
+
+    def set_dropped(self, dropped_frames):
+        self.dropped_frames = dropped_frames
+
+    def set_gauge(self, name, value):
+        self.gauges[name] = value
+
+    def snapshot(self):
+        now = time.monotonic()
+        with self._lock:
+            elapsed = now - self._window_start
+            snapshot = {
+                "fps": self.window_frames / elapsed if elapsed > 0 else 0.0,
+                "frames": self.total_frames,
+                "dropped_frames": self.dropped_frames,
+                "gauges": dict(self.gauges),
+                "stages": {stage: histogram.summary() for stage, histogram in self.histograms.items()},
+            }
+            for histogram in self.histograms.values():
+                histogram.reset()
+            self.window_frames = 0
+            self._window_start = now
+            self.latest = snapshot
+        return snapshot
+
+    def snapshot_if_due(self):
+        if time.monotonic() - self._window_start < self.interval:
+            return None
+        return self.snapshot()
+
+
+def format_snapshot(snapshot):
+    if not snapshot:
+        return []
+    stages = snapshot["stages"]
+    lines = [f"{snapshot['fps']:.1f} fps | dropped {snapshot['dropped_frames']}"]
+    for stage in PipelineMetrics.STAGES:
+        stats = stages.get(stage)
+        if stats and stats["count"]:
+            lines.append(f"{stage}: p50 {stats['p50_ms']:.1f} / p95 {stats['p95_ms']:.1f} ms")
+    for name, value in snapshot.get("gauges", {}).items():
+        lines.append(f"{name}: {value}")
+    return lines
+
+
+pipeline_metrics = PipelineMetrics()
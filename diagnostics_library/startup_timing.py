@@ -0,0 +1,37 @@
+import importlib
+import sys
+import threading
+import time
+
+_process_start = time.perf_counter()
+
+
+class StartupTimer:
+    def __init__(self, start=None):
+        self.start = _process_start if start is None else start
+        self.marks = []
+        self._lock = threading.Lock()
+
+    def mark(self, label):
+        with self._lock:
+            self.marks.append((label, time.perf_counter() - self.start, threading.current_thread().name))
+
+    def timed_import(self, module_name):
+        # Reports only the time actually spent here, a module that is already loaded costs nothing.
+        already_loaded = module_name in sys.modules
+        start_time = time.perf_counter()
+        module = importlib.import_module(module_name)
+        if not already_loaded:
+            self.mark(f"import {module_name} ({1000.0 * (time.perf_counter() - start_time):.0f} ms)")
+        return module
+
+    def report(self):
+        with self._lock:
+            marks = list(self.marks)
+        lines = ["Startup timing (seconds since launch):"]
+        for label, elapsed, thread_name in marks:
+            lines.append(f"  {elapsed:7.3f}s  [{thread_name}] {label}")
+        return lines
+
+
+startup_timer = StartupTimer()
@@ -1,14 +1,8 @@
 import sys
 import os
 import json
-import time
-import cv2
-import numpy as np
-import mediapipe as mp
-from mediapipe.tasks import python as mp_tasks_python
-from mediapipe.tasks.python import vision as mp_tasks_vision
-from typing import Dict
 import platform
+from diagnostics_library.startup_timing import startup_timer
 
 if platform.system() == "Windows":
     import winreg
@@ -26,13 +20,22 @@ except ImportError:
     print("PyQt6 required: pip install PyQt6")
     sys.exit(1)
 
+# Only light modules are imported here so the window shows right away. OpenCV, MediaPipe and
+# the input libraries are loaded by recognizer_warmup on a background thread.
 from configuration.configuration import cfg
-from function_library.trigerable_functions import record_key_press
-from camera_library.hand_croper import HandCropper
-from hand_recognition.hand_processing import process_hands
-import configuration.function_assigne.function_configuration as func_config
-from camera_library.recognition_main_loop import create_gesture_recognizer, to_mp_image
-from camera_library.camera_display import create_camera_capture
+from diagnostics_library.metrics import pipeline_metrics, format_snapshot
+from diagnostics_library.event_log import event_log
+from configuration.config_persistence import settings_writer, assignments_writer, start_config_watcher
+from camera_library.recognizer_warmup import recognizer_warmup, recognizer_pool
+
+startup_timer.mark("UI modules imported")
+
+# Background workers are stopped on exit only if their module was ever loaded.
+BACKGROUND_WORKERS = (
+    ("function_library.action_executor", "action_executor"),
+    ("function_library.cursor_output", "cursor_output"),
+    ("diagnostics_library.debug_capture", "debug_capture"),
+)
 
 APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CONFIG_FILE = os.path.join(APP_DIR, "configuration", "configuration.json")
@@ -159,22 +162,44 @@ class DarkCameraPanel(QFrame):
 
 
 class CameraThread(QThread):
-    frame_ready = pyqtSignal(QImage)
+    # Carries no image: the GUI thread takes the newest one from self.preview when it gets to it.
+    preview_ready = pyqtSignal()
+    metrics_ready = pyqtSignal(dict)
     error = pyqtSignal(str)
 
-    def __init__(self, cam_index=0, parent=None):
+    def __init__(self, cam_index=0, preview_fps=30.0, parent=None):
         super().__init__(parent)
+        from front_end.preview_renderer import PreviewRenderer
         self.cam_index = cam_index
         self.running = False
+        self.preview = PreviewRenderer(preview_fps)
 
     def run(self):
-        recognizer = create_gesture_recognizer()
-        if not recognizer:
+        if cfg.process_pipeline:
+            self.run_process_pipeline()
+            return
+        from camera_library.hand_croper import HandCropper
+        from camera_library.recognition_main_loop import FrameRecognizer
+        from camera_library.frame_sources import create_frame_source, release_frame_source
+        from camera_library.frame_grabber import FrameGrabber
+        from camera_library.camera_display import draw_metrics_overlay
+        from camera_library.camera_capabilities import describe_mode
+        from function_library.cursor_output import cursor_output
+
+        frame_recognizer = FrameRecognizer(
+            live_stream=cfg.live_stream_mode,
+            roi_tracking=cfg.roi_tracking,
+            record_landmarks=cfg.record_landmarks,
+            idle_mode=cfg.idle_mode,
+            keyframe_interval=cfg.keyframe_interval,
+        )
+        if not frame_recognizer.recognizer:
             self.error.emit("Failed to init recognizer")
             return
 
-        cap = create_camera_capture()
-        if not cap or not cap.isOpened():
+        source = create_frame_source(self.cam_index)
+        if not source or not source.isOpened():
+            frame_recognizer.close()
             self.error.emit(f"Cannot open camera {self.cam_index}")
             return
 
@@ -184,42 +209,101 @@ class CameraThread(QThread):
             smoothing_factor=0.1,
         )
 
+        grabber = FrameGrabber(source, drop_frames=source.realtime).start()
+        pipeline_metrics.reset()
+        if getattr(source, "mode", None):
+            pipeline_metrics.set_gauge("camera", describe_mode(source.mode))
         self.running = True
-        while self.running:
-            ret, frame = cap.read()
-            if not ret:
-                time.sleep(0.1)
-                continue
+        cfg.begin_loop()
+        try:
+            while self.running:
+                ret, frame, frame_time = grabber.read(timeout=0.1)
+                if not ret:
+                    if not grabber.running:
+                        break
+                    continue
 
-            try:
-                mp_image = to_mp_image(frame)
-                timestamp_ms = int(time.time() * 1000)
-                recognition_result = recognizer.recognize_for_video(mp_image, timestamp_ms)
-                
-                frame = process_hands(frame, recognition_result)
-
-                hand_landmarks_list = (
-                    recognition_result.hand_landmarks
-                    if recognition_result and recognition_result.hand_landmarks
-                    else None
-                )
-                cropped_frame = cropper.crop(frame, hand_landmarks_list)
-                
-                h, w, ch = cropped_frame.shape
-                bytes_per_line = ch * w
-                rgb_frame = cv2.cvtColor(cropped_frame, cv2.COLOR_BGR2RGB)
-                qt_image = QImage(rgb_frame.data, w, h, bytes_per_line, QImage.Format.Format_RGB888)
-                
-                self.frame_ready.emit(qt_image.copy())
+                try:
+                    config = cfg.begin_frame()
+                    output = frame_recognizer.process(frame, frame_time, grabber.last_arrival_time, config)
+                    pipeline_metrics.set_dropped(grabber.dropped_frames + frame_recognizer.dropped_frames)
+                    snapshot = pipeline_metrics.snapshot_if_due()
+                    if snapshot:
+                        self.metrics_ready.emit(snapshot)
+                    if output is None or not config.preview_enabled or not self.preview.due():
+                        continue
+                    frame, _, overlay = output
+
+                    cropped_frame, origin = cropper.crop(frame, overlay.hands)
+                    overlay.draw(cropped_frame, (frame.shape[1], frame.shape[0]), origin)
+                    if config.metrics_overlay:
+                        draw_metrics_overlay(cropped_frame, pipeline_metrics.latest)
+
+                    if self.preview.render(cropped_frame):
+                        self.preview_ready.emit()
 
-            except Exception as e:
-                print(f"Error in camera loop: {e}")
-                
-        cap.release()
+                except Exception as e:
+                    print(f"Error in camera loop: {e}")
+        finally:
+            cfg.end_loop()
+            grabber.stop()
+            if cfg.debug_mode:
+                print(f"Capture stats: {grabber.stats()}, recognizer stats: {frame_recognizer.stats()}, preview: {self.preview.stats()}")
+            release_frame_source(source)
+            frame_recognizer.close()
+            cursor_output.stop_motion()
+
+    def run_process_pipeline(self):
+        # Capture, inference and actions run in a worker process, this thread only turns the
+        # frames it publishes into preview images.
+        from camera_library.hand_croper import HandCropper
+        from camera_library.process_pipeline import ProcessPipeline
+        from camera_library.camera_display import draw_metrics_overlay
+
+        cropper = HandCropper(
+            output_width=min(cfg.camera_width_crop, cfg.camera_width_default),
+            output_height=min(cfg.camera_height_crop, cfg.camera_height_default),
+            smoothing_factor=0.1,
+        )
+        pipeline = ProcessPipeline(self.cam_index).start()
+        latest_metrics = None
+        self.running = True
+        try:
+            while self.running:
+                message = pipeline.get(timeout=0.1)
+                if message is None:
+                    if not pipeline.is_alive():
+                        self.error.emit("Recognition worker exited")
+                        break
+                    continue
+                kind = message[0]
+                if kind == "error":
+                    self.error.emit(message[1])
+                elif kind == "metrics":
+                    latest_metrics = pipeline.add_hop_gauges(message[1])
+                    self.metrics_ready.emit(latest_metrics)
+                elif kind == "frame" and cfg.preview_enabled:
+                    try:
+                        shown = pipeline.preview(message, cropper)
+                        if shown is None:
+                            continue
+                        cropped_frame, received, arrival = shown
+                        if cfg.metrics_overlay and latest_metrics:
+                            draw_metrics_overlay(cropped_frame, latest_metrics)
+                        if self.preview.render(cropped_frame):
+                            self.preview_ready.emit()
+                        pipeline.rendered(received, arrival)
+                    except Exception as e:
+                        print(f"Error in camera loop: {e}")
+        finally:
+            pipeline.stop()
+            if cfg.debug_mode:
+                print(f"Preview: {self.preview.stats()}, dropped in UI: {pipeline.dropped_frames}")
 
     def stop(self):
         self.running = False
-        self.wait(1000)
+        # The process pipeline waits for its worker to shut down cleanly.
+        self.wait(4000 if cfg.process_pipeline else 1000)
 
 
 class GestureCard(QFrame):
@@ -260,6 +344,10 @@ class GestureCard(QFrame):
 
 
 class MainWindow(QMainWindow):
+    settings_reloaded = pyqtSignal(dict)
+    gestures_reloaded = pyqtSignal()
+    warmup_finished = pyqtSignal()
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("MouseNoNeed Config & Cam")
@@ -273,6 +361,15 @@ class MainWindow(QMainWindow):
         self.help_dialog = None
         
         self.setup_ui()
+
+        # The watcher thread only emits signals, the UI state is updated on the Qt thread.
+        self.settings_reloaded.connect(self.on_settings_reloaded)
+        self.gestures_reloaded.connect(self.on_gestures_reloaded)
+        self.warmup_finished.connect(self.on_warmup_finished)
+        self.config_watcher = start_config_watcher(
+            on_settings=self.settings_reloaded.emit,
+            on_assignments=lambda data: self.gestures_reloaded.emit(),
+        )
     
     def show_help(self):
         if self.help_dialog is None:
@@ -406,13 +503,30 @@ class MainWindow(QMainWindow):
             funcs = self.gestures_data.get(hand, {})
             data.append({"hand": hand, "functions": [funcs]})
         
-        try:
-            with open(FUNC_FILE, 'w') as f:
-                json.dump(data, f, indent=4)
-            func_config.assignments = func_config.load_func_assignments()
-            print("Gestures saved & reloaded.")
-        except Exception as e:
-            print(f"Error saving gestures: {e}")
+        # Written right away (atomically) since the dispatch table is rebuilt from the file.
+        assignments_writer.write_now(data)
+        import configuration.function_assigne.function_configuration as func_config
+        func_config.reload_assignments()
+        print("Gestures saved & reloaded.")
+
+    def on_warmup_finished(self):
+        if recognizer_warmup.error is not None:
+            self.metrics_label.setText(f"Recognizer failed to load: {recognizer_warmup.error}")
+        elif cfg.process_pipeline:
+            self.metrics_label.setText("Performance: preview ready, camera stopped")
+        else:
+            self.metrics_label.setText("Performance: recognizer ready, camera stopped")
+        if cfg.debug_mode:
+            print("\n".join(startup_timer.report()))
+
+    def on_gestures_reloaded(self):
+        self.gestures_data = self.load_gestures()
+        self.refresh_gestures_list()
+        print("Gestures reloaded from disk.")
+
+    def on_settings_reloaded(self, changed):
+        self.settings_data.update(changed)
+        print(f"Settings reloaded from disk: {', '.join(sorted(changed))}")
 
     def load_settings(self):
         if os.path.exists(CONFIG_FILE):
@@ -424,11 +538,8 @@ class MainWindow(QMainWindow):
         return {}
 
     def save_settings(self):
-        try:
-            with open(CONFIG_FILE, 'w') as f:
-                json.dump(self.settings_data, f, indent=4)
-        except Exception as e:
-            print(f"Error saving settings: {e}")
+        # Debounced: typing into a field or toggling several options ends up as one atomic write.
+        settings_writer.schedule(self.settings_data)
 
     def setup_ui(self):
         central = QWidget()
@@ -484,6 +595,12 @@ class MainWindow(QMainWindow):
         self.start_btn.setStyleSheet(f"background: {THEME['button_bg_success']}; color: white; padding: 8px; border-radius: 4px;")
         
         btn_layout.addWidget(self.start_btn)
+
+        self.debug_clip_btn = QPushButton("Save Debug Clip")
+        self.debug_clip_btn.setToolTip("Saves the last seconds of the debug buffer (Debug Mode with debug_capture_mode 'ring').")
+        self.debug_clip_btn.clicked.connect(self.save_debug_clip)
+        self.debug_clip_btn.setStyleSheet(f"background: {THEME['button_bg']}; color: white; padding: 8px; border-radius: 4px;")
+        btn_layout.addWidget(self.debug_clip_btn)
         cam_layout.addLayout(btn_layout)
         
         main_layout.addWidget(cam_container, 2)
@@ -551,13 +668,39 @@ class MainWindow(QMainWindow):
         sett_content_layout.setContentsMargins(0, 0, 0, 0)
         
         self.add_setting_row(sett_content_layout, "Cursor Speed", "cursor_speed")
+        self.add_setting_row(sett_content_layout, "Cursor Rate (Hz)", "cursor_output_hz")
         self.add_setting_row(sett_content_layout, "Scroll Speed", "scroll_speed")
         self.add_setting_row(sett_content_layout, "Boost Factor", "speed_boost_factor")
         self.add_camera_selection_row(sett_content_layout, "Camera Source", "camera_index")
+        self.add_setting_row(sett_content_layout, "Keep Camera Open (s)", "camera_idle_timeout")
+        self.add_setting_row(sett_content_layout, "Camera FPS", "camera_fps")
+        self.add_setting_combo(sett_content_layout, "Camera Format", "camera_fourcc", ["auto", "MJPG", "YUYV"])
         self.add_setting_row(sett_content_layout, "Cam Width (Crop)", "camera_width_crop")
         self.add_setting_row(sett_content_layout, "Cam Height (Crop)", "camera_height_crop")
         self.add_setting_combo(sett_content_layout, "Main Hand", "main_hand", ["Left", "Right"])
+        self.add_setting_combo(sett_content_layout, "Landmark Filter", "landmark_filter", ["none", "one_euro", "kalman"])
+        self.add_setting_row(sett_content_layout, "Filter Min Cutoff", "filter_min_cutoff")
+        self.add_setting_row(sett_content_layout, "Filter Beta", "filter_beta")
         self.add_setting_bool(sett_content_layout, "Debug Mode", "debug_mode")
+        self.add_setting_bool(sett_content_layout, "Event Log", "event_log")
+        self.add_setting_combo(sett_content_layout, "Debug Capture", "debug_capture_mode", ["images", "ring"])
+        self.add_setting_bool(sett_content_layout, "Live Stream Mode", "live_stream_mode")
+        self.add_setting_bool(sett_content_layout, "Separate Recognition Process", "process_pipeline")
+        self.add_setting_bool(sett_content_layout, "ROI Tracking", "roi_tracking")
+        self.add_setting_bool(sett_content_layout, "Idle Mode (no hands)", "idle_mode")
+        self.add_setting_row(sett_content_layout, "Idle After (s)", "idle_after")
+        self.add_setting_row(sett_content_layout, "Model Every N Frames", "keyframe_interval")
+        self.add_setting_bool(sett_content_layout, "Record Landmarks", "record_landmarks")
+        self.add_setting_row(sett_content_layout, "Record Label", "record_label")
+        self.add_setting_combo(sett_content_layout, "Finger Gestures", "gesture_classifier", ["rules", "model", "both"])
+        self.add_setting_bool(sett_content_layout, "Performance Overlay", "metrics_overlay")
+        self.add_setting_bool(sett_content_layout, "Show Preview", "preview_enabled")
+        self.add_setting_row(sett_content_layout, "Preview FPS (0 = display)", "preview_fps")
+
+        self.metrics_label = QLabel("Performance: loading recognizer...")
+        self.metrics_label.setStyleSheet(f"color: {THEME['text_secondary']}; font-family: monospace;")
+        self.metrics_label.setWordWrap(True)
+        sett_content_layout.addWidget(self.metrics_label)
         
         sett_content_layout.addStretch()
         
@@ -586,30 +729,64 @@ class MainWindow(QMainWindow):
             self.start_btn.setStyleSheet(f"background: {THEME['button_bg_success']}; color: white; padding: 8px; border-radius: 4px;")
         else:
             idx = self.settings_data.get("camera_index", 0)
-            self.camera_thread = CameraThread(cam_index=idx)
-            self.camera_thread.frame_ready.connect(self.update_frame)
+            self.camera_thread = CameraThread(cam_index=idx, preview_fps=self.preview_fps())
+            self.camera_thread.preview.target_size = (self.cam_label.width(), self.cam_label.height())
+            self.camera_thread.preview_ready.connect(self.update_frame)
+            self.camera_thread.metrics_ready.connect(self.update_metrics)
             self.camera_thread.error.connect(lambda e: print(e))
             self.camera_thread.start()
             self.start_btn.setText("Stop Camera")
             self.start_btn.setStyleSheet(f"background: {THEME['button_bg_danger']}; color: white; padding: 8px; border-radius: 4px;")
 
-    def update_frame(self, q_img):
-        self.cam_label.setPixmap(QPixmap.fromImage(q_img).scaled(
-            self.cam_label.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation
-        ))
+    def save_debug_clip(self):
+        from diagnostics_library.debug_capture import debug_capture
+        debug_capture.dump()
+
+    def preview_fps(self):
+        if cfg.preview_fps > 0:
+            return cfg.preview_fps
+        screen = self.screen()
+        return screen.refreshRate() if screen is not None else 60.0
+
+    def update_frame(self):
+        preview = self.camera_thread.preview if self.camera_thread else None
+        if preview is None:
+            return
+        # The next image is rendered at the label size, so no scaling is needed here.
+        preview.target_size = (self.cam_label.width(), self.cam_label.height())
+        image = preview.take()
+        if image is None:
+            return
+        try:
+            self.cam_label.setPixmap(QPixmap.fromImage(image))
+        finally:
+            preview.release()
+
+    def update_metrics(self, snapshot):
+        self.metrics_label.setText("Performance:\n" + "\n".join(format_snapshot(snapshot)))
 
     def switch_hand(self):
         self.current_hand = "Secondary" if self.current_hand == "Main" else "Main"
         self.hand_btn.setText(self.current_hand)
         self.refresh_gestures_list()
 
+    def gesture_names(self):
+        # Built-in gestures first, then any other key in function_assigne.json, e.g. gestures of
+        # a trained classifier.
+        names = list(GESTURE_NAMES)
+        for funcs in self.gestures_data.values():
+            for name in funcs:
+                if name not in names:
+                    names.append(name)
+        return names
+
     def refresh_gestures_list(self):
         while self.gestures_list_layout.count():
             item = self.gestures_list_layout.takeAt(0)
             if item.widget(): item.widget().deleteLater()
             
         funcs = self.gestures_data.get(self.current_hand, {})
-        for name in GESTURE_NAMES:
+        for name in self.gesture_names():
             assigned = funcs.get(name, "None")
             card = GestureCard(name, assigned)
             card.edit_clicked.connect(self.edit_gesture)
@@ -643,6 +820,7 @@ class MainWindow(QMainWindow):
                 QMessageBox.information(self, "Custom Hotkey", "Click OK, then press the key you want to bind.")
                 QApplication.processEvents()
                 
+                from function_library.trigerable_functions import record_key_press
                 detected_key = record_key_press()
                 
                 if detected_key:
@@ -653,8 +831,7 @@ class MainWindow(QMainWindow):
                     self.settings_data["custom_hotkeys"][hotkey_name] = detected_key
                     self.save_settings()
 
-                    if hasattr(cfg, "custom_hotkeys"):
-                        cfg.custom_hotkeys[hotkey_name] = detected_key
+                    cfg.update("custom_hotkeys", {**cfg.custom_hotkeys, hotkey_name: detected_key})
                         
                     new_val = f"custom_hotkey:{hotkey_name}"
                     QMessageBox.information(self, "Success", f"Custom hotkey '{hotkey_name}' saved.")
@@ -750,18 +927,36 @@ class MainWindow(QMainWindow):
             self.save_settings()
             
             if hasattr(cfg, key):
-                setattr(cfg, key, value)
+                cfg.update(key, value)
+            if key == "preview_enabled" and not value:
+                self.cam_label.clear()
+                self.cam_label.setText("Preview off")
 
     def closeEvent(self, event):
         if self.camera_thread:
             self.camera_thread.stop()
+        for module_name, worker_name in BACKGROUND_WORKERS:
+            module = sys.modules.get(module_name)
+            if module is not None:
+                getattr(module, worker_name).stop()
+        event_log.stop()
+        # Pooled recognizers and cameras are kept warm between starts, close them for good here.
+        recognizer_pool.clear()
+        frame_sources = sys.modules.get("camera_library.frame_sources")
+        if frame_sources is not None:
+            frame_sources.camera_pool.clear()
+        self.config_watcher.stop()
+        settings_writer.flush()
         event.accept()
 
 
 def runAPP():
     app = QApplication(sys.argv)
+    startup_timer.mark("QApplication created")
     window = MainWindow()
     window.show()
+    startup_timer.mark("window shown")
+    recognizer_warmup.start(on_ready=window.warmup_finished.emit)
     sys.exit(app.exec())
 
 
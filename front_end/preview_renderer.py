@@ -0,0 +1,85 @@
+import threading
+import time
+import cv2
+import numpy as np
+from PyQt6.QtGui import QImage
+
+BUFFER_COUNT = 3
+
+
+class PreviewRenderer:
+    # Produces preview images at the size of the widget showing them, at most max_fps times a
+    # second. Images are written into a few preallocated buffers and only the newest one is
+    # kept for the GUI thread, so a slow GUI never makes frames pile up.
+    def __init__(self, max_fps=30.0):
+        self.max_fps = max_fps
+        self.target_size = (640, 480)
+        self.rendered = 0
+        self.replaced = 0
+        self._lock = threading.Lock()
+        self._buffers = [None] * BUFFER_COUNT
+        self._resized = None
+        self._pending = None
+        self._in_use = None
+        self._next_render = 0.0
+
+    def due(self, now=None):
+        if self.max_fps <= 0:
+            return True
+        if now is None:
+            now = time.monotonic()
+        if now < self._next_render:
+            return False
+        self._next_render = max(self._next_render + 1.0 / self.max_fps, now)
+        return True
+
+    def _fit(self, w, h):
+        target_w, target_h = self.target_size
+        scale = min(target_w / w, target_h / h)
+        return max(1, int(w * scale)), max(1, int(h * scale))
+
+    def render(self, frame):
+        # Returns True when the GUI has to be told about a new image, False when it was
+        # already notified and will simply pick up this newer one.
+        h, w = frame.shape[:2]
+        out_w, out_h = self._fit(w, h)
+        with self._lock:
+            index = next(i for i in range(BUFFER_COUNT) if i != self._pending and i != self._in_use)
+        buffer = self._buffers[index]
+        if buffer is None or buffer.shape[:2] != (out_h, out_w):
+            buffer = np.empty((out_h, out_w, 3), dtype=np.uint8)
+            self._buffers[index] = buffer
+
+        if self._resized is None or self._resized.shape[:2] != (out_h, out_w):
+            self._resized = np.empty((out_h, out_w, 3), dtype=np.uint8)
+        interpolation = cv2.INTER_AREA if out_w < w else cv2.INTER_LINEAR
+        cv2.resize(frame, (out_w, out_h), dst=self._resized, interpolation=interpolation)
+        cv2.cvtColor(self._resized, cv2.COLOR_BGR2RGB, dst=buffer)
+        self.rendered += 1
+
+        with self._lock:
+            notify = self._pending is None
+            if not notify:
+                self.replaced += 1
+            self._pending = index
+        return notify
+
+    def take(self):
+        # GUI thread: the returned QImage wraps the buffer without copying, call release()
+        # once it has been turned into a pixmap.
+        with self._lock:
+            index = self._pending
+            self._pending = None
+            self._in_use = index
+        if index is None:
+            return None
+        buffer = self._buffers[index]
+        h, w = buffer.shape[:2]
+        return QImage(buffer.data, w, h, 3 * w, QImage.Format.Format_RGB888)
+
+    def release(self):
+        with self._lock:
+            self._in_use = None
+
+    def stats(self):
+        return {"preview_rendered": self.rendered, "preview_replaced": self.replaced}
@@ -0,0 +1,90 @@
+import threading
+import time
+from collections import deque
+from diagnostics_library.metrics import pipeline_metrics
+
+
+class ActionExecutor:
+    def __init__(self, max_queue=16):
+        self.max_queue = max_queue
+        self.running = False
+        self.executed_actions = 0
+        self.coalesced_actions = 0
+        self.dropped_actions = 0
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._pending = {}
+        self._thread = None
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self.running = True
+            self._thread = threading.Thread(target=self._run, name="ActionExecutor", daemon=True)
+            self._thread.start()
+
+    def submit(self, key, action, accumulate=False):
+        # A request for an action that is still queued is merged into it: step actions
+        # (scroll, volume) add up their steps, everything else is simply not repeated.
+        with self._cond:
+            item = self._pending.get(key)
+            if item is not None:
+                if accumulate:
+                    item[2] += 1
+                self.coalesced_actions += 1
+                return True
+            if len(self._queue) >= self.max_queue:
+                self.dropped_actions += 1
+                return False
+            item = [key, action, 1, time.monotonic(), accumulate]
+            self._queue.append(item)
+            self._pending[key] = item
+            pipeline_metrics.set_gauge("action_queue_depth", len(self._queue))
+            self._ensure_started()
+            self._cond.notify()
+            return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or not self.running)
+                if not self._queue:
+                    return
+                item = self._queue.popleft()
+                self._pending.pop(item[0], None)
+                depth = len(self._queue)
+
+            key, action, steps, submitted_at, accumulate = item
+            try:
+                if accumulate:
+                    action(steps)
+                else:
+                    action()
+            except Exception as e:
+                print(f"Action '{key}' failed: {e}")
+            self.executed_actions += 1
+            pipeline_metrics.record("action_latency", time.monotonic() - submitted_at)
+            pipeline_metrics.set_gauge("action_queue_depth", depth)
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self._queue)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "queued": len(self._queue),
+                "executed": self.executed_actions,
+                "coalesced": self.coalesced_actions,
+                "dropped": self.dropped_actions,
+            }
+
+    def stop(self, timeout=1.0):
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+
+action_executor = ActionExecutor()
@@ -0,0 +1,112 @@
+import math
+import threading
+import time
+import pyautogui
+from configuration.configuration import cfg
+
+pyautogui.FAILSAFE = False
+pyautogui.PAUSE = 0
+
+
+class CursorOutput:
+    def __init__(self, velocity_timeout=0.5, move=pyautogui.moveRel):
+        self.velocity_timeout = velocity_timeout
+        self.move = move
+        self.running = False
+        self.remainder_x = 0.0
+        self.remainder_y = 0.0
+        self.ticks = 0
+        self.moves = 0
+        self._cond = threading.Condition()
+        self._velocity_x = 0.0
+        self._velocity_y = 0.0
+        self._velocity_time = 0.0
+        self._thread = None
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            self.running = True
+            self._thread = threading.Thread(target=self._run, name="CursorOutput", daemon=True)
+            self._thread.start()
+
+    def set_velocity(self, velocity_x, velocity_y):
+        with self._cond:
+            self._velocity_x = velocity_x
+            self._velocity_y = velocity_y
+            self._velocity_time = time.monotonic()
+            self._cond.notify()
+        self._ensure_started()
+
+    def set_direction(self, angle_degrees, speed_px_per_sec):
+        angle_radians = math.radians(angle_degrees)
+        self.set_velocity(speed_px_per_sec * math.cos(angle_radians), -speed_px_per_sec * math.sin(angle_radians))
+
+    def stop_motion(self):
+        with self._cond:
+            self._velocity_x = 0.0
+            self._velocity_y = 0.0
+
+    def _moving(self, now):
+        fresh = now - self._velocity_time <= self.velocity_timeout
+        return fresh and (self._velocity_x != 0.0 or self._velocity_y != 0.0)
+
+    def _run(self):
+        last_tick = time.monotonic()
+        next_tick = last_tick
+        while self.running:
+            with self._cond:
+                if not self._moving(time.monotonic()):
+                    # Nothing to move: sleep until set_velocity() instead of ticking at cursor_output_hz.
+                    self.remainder_x = 0.0
+                    self.remainder_y = 0.0
+                    self._cond.wait_for(lambda: not self.running or self._moving(time.monotonic()))
+                    last_tick = next_tick = time.monotonic()
+            if not self.running:
+                break
+            next_tick += 1.0 / max(1, cfg.cursor_output_hz)
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.monotonic()
+
+            now = time.monotonic()
+            dt = now - last_tick
+            last_tick = now
+            self.ticks += 1
+            with self._cond:
+                velocity_x = self._velocity_x
+                velocity_y = self._velocity_y
+                stale = now - self._velocity_time > self.velocity_timeout
+
+            # No fresh velocity from the recognition loop (hand lost, loop stalled): hold still.
+            if stale or (velocity_x == 0.0 and velocity_y == 0.0):
+                self.remainder_x = 0.0
+                self.remainder_y = 0.0
+                continue
+
+            # Movement is based on elapsed time, so the speed no longer depends on the camera fps.
+            self.remainder_x += velocity_x * dt
+            self.remainder_y += velocity_y * dt
+            move_int_x = int(self.remainder_x)
+            move_int_y = int(self.remainder_y)
+            if move_int_x != 0 or move_int_y != 0:
+                try:
+                    self.move(move_int_x, move_int_y)
+                except Exception as e:
+                    if cfg.debug_mode:
+                        print(f"CursorOutput move error: {e}")
+                self.moves += 1
+                self.remainder_x -= move_int_x
+                self.remainder_y -= move_int_y
+
+    def stop(self):
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+
+cursor_output = CursorOutput()
@@ -1,7 +1,9 @@
-import math
+import numpy as np
 
 def calculate_distance(p1, p2):
-    return math.sqrt((p1.x - p2.x) ** 2 + (p1.y - p2.y) ** 2)
+    # Works on (..., 3) landmark arrays, distances are taken in the image plane.
+    d = np.asarray(p1)[..., :2] - np.asarray(p2)[..., :2]
+    return np.hypot(d[..., 0], d[..., 1])
 
 
 def should_calculate_angle(top_gesture, finger_gesture_text):
@@ -12,20 +14,23 @@ def should_calculate_angle(top_gesture, finger_gesture_text):
     return False
 
 
-def calculate_pointer_angle(proto, hand_label):
+def calculate_pointer_angle(landmarks, hand_label=None):
     try:
-        if len(proto.landmark) <= 8:
+        landmarks = np.asarray(landmarks)
+        if landmarks.ndim < 2 or landmarks.shape[-2] <= 8:
             print("Required landmarks for angle calculation are missing (need 5 and 8).")
             return None
-        p5 = proto.landmark[5]
-        p8 = proto.landmark[8]
-        dx = p8.x - p5.x
-        dy_math = p5.y - p8.y
-        theta = math.degrees(math.atan2(dy_math, dx))
+        p5 = landmarks[..., 5, :]
+        p8 = landmarks[..., 8, :]
+        dx = p8[..., 0] - p5[..., 0]
+        dy_math = p5[..., 1] - p8[..., 1]
+        theta = np.degrees(np.arctan2(dy_math, dx))
         theta = (theta + 360.0) % 360.0
         degrees = (180.0 - theta) % 360.0
         #degrees_mirrored = (180.0 - degrees) % 360.0
         #print(f"  -> ACTION ({hand_label}): 'pointer' tilt: {degrees_mirrored:.2f}° mirrored)")
+        if np.ndim(degrees) == 0:
+            return float(degrees)
         return degrees
     except Exception as e:
         print(f"Error calculating angle: {e}")
@@ -1,6 +1,7 @@
 import time
 import pyautogui
 from configuration.configuration import cfg
+from diagnostics_library.event_log import event_log
 import math
 import subprocess
 import os
@@ -40,16 +41,15 @@ last_mute_time = 0
 
 
 def is_applied_boost(boost_applied_this_frame):
-    if cfg.debug_mode:
-        print("RESET BOOST:", boost_applied_this_frame, cfg.speed_boost_active)    
     if not boost_applied_this_frame and cfg.speed_boost_active:
+        event_log.log("boost", detail="off")
         cfg.cursor_speed = cfg.default_cursor_speed
         cfg.scroll_speed = cfg.default_scroll_speed
         cfg.speed_boost_active = False
 
 def apply_speed_boost():
-    if cfg.debug_mode:
-        print("APPLY BOOST:", cfg.cursor_speed, cfg.scroll_speed)
+    if not cfg.speed_boost_active:
+        event_log.log("boost", detail="on")
     cfg.cursor_speed = int(cfg.default_cursor_speed * cfg.speed_boost_factor)
     cfg.scroll_speed = int(cfg.default_scroll_speed * cfg.speed_boost_factor)
     cfg.speed_boost_active = True
@@ -180,9 +180,9 @@ def maximize_window(last_click_time):
         return current_time
     return last_click_time
 
-def update_scrolling(direction=1):
+def update_scrolling(direction=1, steps=1):
     global scroll_remainder
-    step = cfg.scroll_speed if direction > 0 else -cfg.scroll_speed 
+    step = cfg.scroll_speed * steps if direction > 0 else -cfg.scroll_speed * steps
     scroll_remainder += step
     scroll_int = int(scroll_remainder)
     if scroll_int != 0:
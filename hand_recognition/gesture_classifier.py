@@ -0,0 +1,281 @@
+import argparse
+import os
+import time
+import numpy as np
+from configuration.configuration import cfg
+
+# Recordings labelled with this name are examples of "no gesture", the class is never reported.
+NONE_LABEL = "none"
+WRIST = 0
+MIDDLE_MCP = 9
+TIP_PAIRS = np.array([(4, 8), (4, 12), (4, 16), (4, 20), (8, 12), (12, 16), (16, 20), (8, 20)])
+
+
+def landmark_features(hands, hand_labels=None):
+    # (hands x 21 x 3) landmarks -> (hands x 68) features that do not depend on where the hand
+    # is in the image or how far from the camera it is. Left hands are mirrored so one model
+    # serves both hands.
+    hands = np.asarray(hands, dtype=np.float32)
+    relative = hands - hands[:, WRIST:WRIST + 1, :]
+    scale = np.linalg.norm(relative[:, MIDDLE_MCP, :2], axis=1)
+    relative /= np.where(scale > 1e-6, scale, 1.0)[:, None, None]
+    if hand_labels is not None:
+        relative[np.array([label == "Left" for label in hand_labels], dtype=bool), :, 0] *= -1.0
+    tip_distances = np.linalg.norm(relative[:, TIP_PAIRS[:, 0], :2] - relative[:, TIP_PAIRS[:, 1], :2], axis=2)
+    return np.concatenate([relative[:, 1:, :].reshape(len(hands), -1), tip_distances], axis=1)
+
+
+def _softmax(logits):
+    logits = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+class SoftmaxModel:
+    kind = "softmax"
+
+    def __init__(self, weights=None, bias=None):
+        self.weights = weights
+        self.bias = bias
+
+    def fit(self, x, y, class_count, epochs=400, learning_rate=0.5, l2=1e-3):
+        # Full-batch gradient descent, a few thousand samples of 68 features train in a second.
+        onehot = np.eye(class_count, dtype=np.float32)[y]
+        self.weights = np.zeros((x.shape[1], class_count), dtype=np.float32)
+        self.bias = np.zeros(class_count, dtype=np.float32)
+        for _ in range(epochs):
+            error = (_softmax(x @ self.weights + self.bias) - onehot) / len(x)
+            self.weights -= learning_rate * (x.T @ error + l2 * self.weights)
+            self.bias -= learning_rate * error.sum(axis=0)
+        return self
+
+    def predict_proba(self, x):
+        return _softmax(x @ self.weights + self.bias)
+
+    def params(self):
+        return {"weights": self.weights, "bias": self.bias}
+
+
+class KNNModel:
+    kind = "knn"
+
+    def __init__(self, samples=None, labels=None, k=5, class_count=0):
+        self.samples = samples
+        self.labels = labels
+        self.k = int(k)
+        self.class_count = int(class_count)
+        self._norms = None if samples is None else (samples ** 2).sum(axis=1)
+
+    def fit(self, x, y, class_count, max_per_class=200, seed=0):
+        # The example set is capped per class, inference time grows with it.
+        rng = np.random.default_rng(seed)
+        keep = np.concatenate([
+            rng.permutation(np.flatnonzero(y == c))[:max_per_class] for c in range(class_count)
+        ])
+        self.samples = x[keep].astype(np.float32)
+        self.labels = y[keep].astype(np.int32)
+        self.class_count = class_count
+        self._norms = (self.samples ** 2).sum(axis=1)
+        return self
+
+    def predict_proba(self, x):
+        k = min(self.k, len(self.samples))
+        distances = (x ** 2).sum(axis=1)[:, None] - 2.0 * x @ self.samples.T + self._norms[None, :]
+        nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        proba = np.zeros((len(x), self.class_count), dtype=np.float32)
+        np.add.at(proba, (np.arange(len(x))[:, None], self.labels[nearest]), 1.0 / k)
+        return proba
+
+    def params(self):
+        return {"samples": self.samples, "labels": self.labels, "k": np.array(self.k), "class_count": np.array(self.class_count)}
+
+
+MODELS = {SoftmaxModel.kind: SoftmaxModel, KNNModel.kind: KNNModel}
+
+
+class GestureClassifier:
+    def __init__(self, classes, model, mean, std):
+        self.classes = list(classes)
+        self.model = model
+        self.mean = mean
+        self.std = std
+
+    @classmethod
+    def train(cls, hands, hand_labels, labels, kind="softmax"):
+        classes = sorted(set(labels))
+        y = np.array([classes.index(label) for label in labels], dtype=np.int32)
+        features = landmark_features(hands, hand_labels)
+        mean = features.mean(axis=0)
+        std = features.std(axis=0) + 1e-6
+        model = MODELS[kind]().fit((features - mean) / std, y, len(classes))
+        return cls(classes, model, mean, std)
+
+    def predict_proba(self, hands, hand_labels=None):
+        return self.model.predict_proba((landmark_features(hands, hand_labels) - self.mean) / self.std)
+
+    def predict(self, hands, hand_labels=None, min_confidence=0.0):
+        # One (gesture, confidence) per hand, "" where the model is unsure or sees no gesture.
+        if len(hands) == 0:
+            return []
+        proba = self.predict_proba(hands, hand_labels)
+        best = proba.argmax(axis=1)
+        confidence = proba[np.arange(len(best)), best]
+        valid = ~np.isnan(np.asarray(hands)).any(axis=(1, 2))
+        results = []
+        for i, class_index in enumerate(best):
+            name = self.classes[class_index]
+            if not valid[i] or name == NONE_LABEL or confidence[i] < min_confidence:
+                results.append(("", float(confidence[i]) if valid[i] else 0.0))
+            else:
+                results.append((name, float(confidence[i])))
+        return results
+
+    def gesture_names(self):
+        return [name for name in self.classes if name != NONE_LABEL]
+
+    def save(self, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                kind=np.array(self.model.kind),
+                classes=np.array(self.classes),
+                mean=self.mean,
+                std=self.std,
+                **{f"param_{name}": value for name, value in self.model.params().items()},
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            params = {name[len("param_"):]: data[name] for name in data.files if name.startswith("param_")}
+            model = MODELS[str(data["kind"])](**params)
+            return cls([str(name) for name in data["classes"]], model, data["mean"], data["std"])
+
+
+class ClassifierLoader:
+    # Loads the model named by gesture_model_path and picks up a retrained file within a second.
+    def __init__(self, check_interval=1.0):
+        self.check_interval = check_interval
+        self._key = None
+        self._path = None
+        self._model = None
+        self._next_check = 0.0
+
+    def get(self, path=None):
+        if path is None:
+            path = cfg.gesture_model_path
+        now = time.monotonic()
+        if now < self._next_check and path == self._path:
+            return self._model
+        self._next_check = now + self.check_interval
+        self._path = path
+        try:
+            key = (path, os.path.getmtime(path))
+        except OSError:
+            key = (path, None)
+        if key != self._key:
+            self._key = key
+            self._model = None
+            if key[1] is not None:
+                try:
+                    self._model = GestureClassifier.load(path)
+                except Exception as e:
+                    print(f"Could not load gesture model {path}: {e}")
+        return self._model
+
+
+classifier_loader = ClassifierLoader()
+
+
+def load_training_data(sources, hand=None):
+    # sources are recording paths, optionally prefixed with "label=". Without a prefix the label
+    # stored in the recording (record_label setting) is used.
+    from hand_recognition.landmark_recording import LandmarkRecording, HANDEDNESS_LABELS
+
+    all_hands, all_hand_labels, all_labels = [], [], []
+    for source in sources:
+        label, _, path = source.partition("=") if "=" in source else ("", "", source)
+        recording = LandmarkRecording(path)
+        label = label or recording.label
+        if not label:
+            print(f"Skipping {path}: no label, record it with a Record Label or pass LABEL={path}.")
+            continue
+        landmarks = np.asarray(recording.landmarks)
+        hand_labels = np.array([HANDEDNESS_LABELS[int(i)] for i in recording.handedness], dtype=object)
+        keep = ~np.isnan(landmarks).any(axis=(1, 2))
+        if hand is not None:
+            keep &= hand_labels == hand
+        all_hands.append(landmarks[keep])
+        all_hand_labels.extend(hand_labels[keep].tolist())
+        all_labels.extend([label] * int(keep.sum()))
+    if not all_hands:
+        return np.zeros((0, 21, 3), dtype=np.float32), [], []
+    return np.concatenate(all_hands), all_hand_labels, all_labels
+
+
+def _split(labels, holdout, seed=0):
+    # Per class, so a rare gesture is represented on both sides.
+    rng = np.random.default_rng(seed)
+    labels = np.asarray(labels)
+    test = np.zeros(len(labels), dtype=bool)
+    for label in np.unique(labels):
+        rows = rng.permutation(np.flatnonzero(labels == label))
+        test[rows[:int(len(rows) * holdout)]] = True
+    return ~test, test
+
+
+def time_per_hand(classifier, hands, hand_labels, repeats=2000):
+    batch = hands[:2]
+    batch_labels = hand_labels[:2]
+    start = time.perf_counter()
+    for _ in range(repeats):
+        classifier.predict(batch, batch_labels)
+    return (time.perf_counter() - start) / (repeats * len(batch))
+
+
+def main():
+    from configuration.config_persistence import add_gesture_keys
+
+    parser = argparse.ArgumentParser(description="Train the landmark gesture classifier from labelled landmark recordings.")
+    parser.add_argument("recordings", nargs="+", help="recording paths, as LABEL=PATH to override the recorded label")
+    parser.add_argument("--model", choices=sorted(MODELS), default="softmax")
+    parser.add_argument("--hand", choices=["Left", "Right"], help="only use hands with this handedness")
+    parser.add_argument("--holdout", type=float, default=0.2, help="fraction of every class used to report accuracy")
+    parser.add_argument("--output", default=cfg.gesture_model_path)
+    args = parser.parse_args()
+
+    hands, hand_labels, labels = load_training_data(args.recordings, args.hand)
+    if len(set(labels)) < 2:
+        print("At least two labels are needed, record a 'none' session to teach the model what no gesture looks like.")
+        return
+    for label in sorted(set(labels)):
+        print(f"  {label:<24} {labels.count(label)} hands")
+
+    def pick(values, mask):
+        return [value for value, keep in zip(values, mask) if keep]
+
+    train, test = _split(labels, args.holdout)
+    if test.any():
+        classifier = GestureClassifier.train(hands[train], pick(hand_labels, train), pick(labels, train), args.model)
+        predicted = [name or NONE_LABEL for name, _ in classifier.predict(hands[test], pick(hand_labels, test))]
+        accuracy = float(np.mean(np.array(predicted) == np.array(pick(labels, test))))
+        print(f"Holdout accuracy: {accuracy:.3f} on {int(test.sum())} hands")
+
+    classifier = GestureClassifier.train(hands, hand_labels, labels, args.model)
+    print(f"Inference: {time_per_hand(classifier, hands, hand_labels) * 1e6:.1f} us per hand")
+    classifier.save(args.output)
+    print(f"Model written to {os.path.abspath(args.output)}")
+
+    added = add_gesture_keys(classifier.gesture_names())
+    if added:
+        print(f"New assignable gestures: {', '.join(added)}")
+    if cfg.gesture_classifier == "rules":
+        print("Set 'Finger Gestures' to 'model' or 'both' to use it.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import time
+from configuration.configuration import cfg
+
+
+class HandGestureState:
+    # Debounce state used while classifying the finger gestures of one hand.
+    def __init__(self):
+        self.pointer_candidate_since = None
+        self.two_fingers_candidate_since = None
+        self.pinch_candidate_since = None
+        self.pinch_active_until = 0.0
+
+
+class GestureEventMachine:
+    def __init__(self, enter_delay=0.1, release_delay=0.15, hold_interval=0.2):
+        self.enter_delay = enter_delay
+        self.release_delay = release_delay
+        self.hold_interval = hold_interval
+        self.active = None
+        self.last_seen = 0.0
+        self.next_hold = 0.0
+        self.candidate = None
+        self.candidate_since = 0.0
+
+    def update(self, gesture, now):
+        events = []
+        if gesture and gesture == self.active:
+            self.last_seen = now
+            self.candidate = None
+            if now >= self.next_hold:
+                events.append(("hold", gesture))
+                self.next_hold = max(self.next_hold + self.hold_interval, now)
+            return events
+
+        if gesture:
+            if gesture != self.candidate:
+                self.candidate = gesture
+                self.candidate_since = now
+            if now - self.candidate_since >= self.enter_delay:
+                if self.active:
+                    events.append(("release", self.active))
+                self.active = gesture
+                self.last_seen = now
+                self.next_hold = now + self.hold_interval
+                self.candidate = None
+                events.append(("enter", gesture))
+                return events
+        else:
+            self.candidate = None
+
+        # Hysteresis: a gesture that flickers out for less than release_delay stays active.
+        if self.active and now - self.last_seen >= self.release_delay:
+            events.append(("release", self.active))
+            self.active = None
+        return events
+
+
+class HandTracker:
+    def __init__(self, config=cfg):
+        self.classification = HandGestureState()
+        self.events = GestureEventMachine()
+        self.version = None
+        self.refresh(config)
+
+    def refresh(self, config):
+        # Picks up changed delays, checked every frame but only reapplied when the config changed.
+        if config.version == self.version:
+            return
+        self.version = config.version
+        self.events.enter_delay = config.gesture_enter_delay
+        self.events.release_delay = config.gesture_release_delay
+        self.events.hold_interval = 1.0 / config.gesture_hold_hz if config.gesture_hold_hz > 0 else float("inf")
+
+
+class GestureTracker:
+    def __init__(self):
+        self.hands = {}
+
+    def hand(self, hand_label, config=cfg):
+        tracker = self.hands.get(hand_label)
+        if tracker is None:
+            tracker = HandTracker(config)
+            self.hands[hand_label] = tracker
+        else:
+            tracker.refresh(config)
+        return tracker
+
+    def classification_states(self, hand_labels, config=cfg):
+        return [self.hand(hand_label, config).classification for hand_label in hand_labels]
+
+    def release_missing(self, present_labels, now=None, config=cfg):
+        if now is None:
+            now = time.monotonic()
+        events = []
+        for hand_label, tracker in self.hands.items():
+            if hand_label not in present_labels:
+                tracker.refresh(config)
+                tracker.classification = HandGestureState()
+                for kind, gesture in tracker.events.update("", now):
+                    events.append((hand_label, kind, gesture))
+        return events
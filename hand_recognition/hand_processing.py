@@ -1,26 +1,73 @@
 from configuration.configuration import cfg
-from configuration.function_assigne.function_configuration import select_and_call_func
+from configuration.function_assigne.function_configuration import dispatch_gesture_event, resolve_event_func_name
 from function_library.math_functions import should_calculate_angle, calculate_pointer_angle
-from camera_library.camera_display import draw_corner_labels, get_labels, to_landmark_proto, extract_lists
+from camera_library.camera_display import HandOverlay, get_labels, extract_lists, landmarks_to_array
 from function_library.trigerable_functions import update_mouse_movement, is_applied_boost
-from hand_recognition.manual_hand_recognition import detect_finger_gesture
+from function_library.cursor_output import cursor_output
+from hand_recognition.manual_hand_recognition import detect_finger_gestures
+from diagnostics_library.metrics import pipeline_metrics
+from hand_recognition.landmark_filters import landmark_filter_bank
+from hand_recognition.gesture_state import GestureTracker
+from diagnostics_library.debug_capture import debug_capture
+from diagnostics_library.event_log import event_log
 import traceback
 import os
-import cv2
 import time
-import logging
-
-# Setup logging
-logging.basicConfig(
-    filename='debug_log.txt',
-    level=logging.INFO,
-    format='%(asctime)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
 
 _last_logged_gesture_by_hand = {}
+_default_gesture_tracker = GestureTracker()
+
+
+class LiveActuator:
+    # Turns gesture events and pointer angles into real mouse and keyboard input.
+    def dispatch(self, hand_label, gesture_key, kind, config):
+        return dispatch_gesture_event(hand_label, gesture_key, kind, config)
+
+    def move_cursor(self, degrees, config):
+        # Returns True when the cursor output thread keeps moving the cursor after this frame.
+        if config.cursor_output_hz > 0:
+            # cursor_speed is pixels per frame at cursor_reference_fps.
+            cursor_output.set_direction(degrees, config.cursor_speed * config.cursor_reference_fps)
+            return True
+        update_mouse_movement(degrees, config.cursor_speed)
+        return False
+
+    def end_frame(self, pointer_active, boost_applied, config):
+        if not pointer_active and config.cursor_output_hz > 0:
+            cursor_output.stop_motion()
+        is_applied_boost(boost_applied)
+
+
+class DryRunActuator:
+    # Records what would have been done instead, for replays and benchmarks.
+    def __init__(self):
+        self.actions = []
+
+    def dispatch(self, hand_label, gesture_key, kind, config):
+        func_name = resolve_event_func_name(hand_label, gesture_key, kind, config)
+        if func_name is None:
+            return False
+        if kind != "active":
+            self.actions.append((hand_label, kind, gesture_key, func_name))
+        return func_name == "apply_boost"
 
-def _log_gesture_change(hand_label: str, top_gesture, finger_gesture_text: str, frame=None):
+    def move_cursor(self, degrees, config):
+        self.actions.append((config.off_hand, "cursor", round(float(degrees), 1), config.cursor_speed))
+        return False
+
+    def end_frame(self, pointer_active, boost_applied, config):
+        pass
+
+    def take(self):
+        actions = self.actions
+        self.actions = []
+        return actions
+
+
+live_actuator = LiveActuator()
+
+def _log_gesture_change(hand_label: str, top_gesture, finger_gesture_text: str, config=cfg):
+    # Returns the path of a debug image to save for this change, if any.
     top_name = getattr(top_gesture, "category_name", "") if top_gesture else ""
     top_score = getattr(top_gesture, "score", None) if top_gesture else None
 
@@ -32,37 +79,61 @@ def _log_gesture_change(hand_label: str, top_gesture, finger_gesture_text: str,
 
     msg = " | ".join(parts) if len(parts) > 1 else f"{hand_label or 'Unknown'} | -"
 
-    prev = _last_logged_gesture_by_hand.get(hand_label)
-    if prev != msg:
-        _last_logged_gesture_by_hand[hand_label] = msg
-        if cfg.debug_mode:
-            print(f"[gesture] {msg}")
-            logging.info(f"[gesture] {msg}")
-            
-            if frame is not None and (top_name or finger_gesture_text):
-                try:
-                    if not os.path.exists("debug_images"):
-                        os.makedirs("debug_images")
-                    timestamp = int(time.time() * 1000)
-                    filename = f"debug_images/{timestamp}_{hand_label}_{top_name}_{finger_gesture_text}.jpg".replace(" ", "_").replace(":", "")
-                    cv2.imwrite(filename, frame, [cv2.IMWRITE_JPEG_QUALITY, 50])
-                except Exception as e:
-                    print(f"Failed to save debug image: {e}")
-
-def process_hands(frame, recognition_result):
-    h, w = frame.shape[:2]
+    # Keyed on the gesture names only, a score that moves by 0.01 is not a gesture change.
+    key = (top_name, finger_gesture_text)
+    if _last_logged_gesture_by_hand.get(hand_label) != key:
+        _last_logged_gesture_by_hand[hand_label] = key
+        event_log.log("gesture", hand_label, top_name, top_score, None, finger_gesture_text or None)
+        if config.debug_mode:
+            # Disk writes happen on the debug capture thread, not here.
+            if config.debug_capture_mode == "ring":
+                debug_capture.add_event(msg)
+            elif top_name or finger_gesture_text:
+                timestamp = int(time.time() * 1000)
+                filename = f"{timestamp}_{hand_label}_{top_name}_{finger_gesture_text}.jpg".replace(" ", "_").replace(":", "")
+                return os.path.join(config.debug_capture_dir, filename)
+    return None
+
+def process_hands(frame, recognition_result, gesture_tracker=None, config=None, now=None, actuator=None):
+    # config is the snapshot of the frame, every setting is read from it so a change made
+    # meanwhile in the UI only takes effect from the next frame on. now is the frame's clock,
+    # replays pass the recorded timestamp so delays and debouncing behave as they did live.
+    if gesture_tracker is None:
+        gesture_tracker = _default_gesture_tracker
+    if config is None:
+        config = cfg.snapshot()
+    if actuator is None:
+        actuator = live_actuator
+    start_time = time.perf_counter()
+    if now is None:
+        now = time.monotonic()
+    event_log.next_frame()
+    actuation_time = 0.0
+    overlay = HandOverlay()
     try:
         gestures_list, handedness_list, landmarks_list = extract_lists(recognition_result)
         count = min(len(gestures_list), len(handedness_list), len(landmarks_list))
 
-        left_corner_text = None
-        right_corner_text = None
+        hand_labels = [
+            handedness_list[i][0].category_name if handedness_list[i] else "Unknown"
+            for i in range(count)
+        ]
+        hands = getattr(recognition_result, "landmark_array", None)
+        if hands is None or len(hands) != count:
+            hands = landmarks_to_array(landmarks_list[:count])
+        hands = landmark_filter_bank.apply(hands, hand_labels, now, config)
+        finger_gestures = detect_finger_gestures(
+            hands, hand_labels, now, gesture_tracker.classification_states(hand_labels, config), config
+        )
+
+        overlay = HandOverlay(hands, hand_labels)
+        debug_images = []
         boost_applied_this_frame = False
+        pointer_active = False
 
         for i in range(count):
             try:
-                hand_label = handedness_list[i][0].category_name if handedness_list[i] else "Unknown"
-                color = (255, 0, 0) if hand_label == "Left" else (0, 0, 255)
+                hand_label = hand_labels[i]
 
                 top_gesture_text = ""
                 top_gesture = None
@@ -70,36 +141,48 @@ def process_hands(frame, recognition_result):
                     top_gesture = gestures_list[i][0]
                     top_gesture_text = f"{top_gesture.category_name} {top_gesture.score:.2f}"
 
-                proto = to_landmark_proto(landmarks_list[i])
-
-                cfg.mp_drawing.draw_landmarks(
-                    frame,
-                    proto,
-                    cfg.mp_hands.HAND_CONNECTIONS,
-                    cfg.mp_drawing.DrawingSpec(color=color, thickness=2, circle_radius=3),
-                    cfg.mp_drawing.DrawingSpec(color=color, thickness=2, circle_radius=2),
-                )
+                finger_gesture_text, _ = finger_gestures[i]
 
-                finger_gesture_text, _ = detect_finger_gesture(proto, hand_label)
-
-                _log_gesture_change(hand_label, top_gesture, finger_gesture_text, frame)
+                debug_image = _log_gesture_change(hand_label, top_gesture, finger_gesture_text, config)
+                if debug_image:
+                    debug_images.append(debug_image)
                 
-                boost_applied = select_and_call_func(top_gesture, hand_label, finger_gesture_text)
-                boost_applied_this_frame = boost_applied_this_frame or boost_applied
-                left_corner_text, right_corner_text = get_labels(top_gesture_text, hand_label, finger_gesture_text, left_corner_text, right_corner_text)
-
-                if should_calculate_angle(top_gesture, finger_gesture_text) and hand_label == cfg.off_hand:
-                    degrees = calculate_pointer_angle(proto, hand_label)
+                gesture_key = finger_gesture_text or (top_gesture.category_name if top_gesture else "")
+                events = gesture_tracker.hand(hand_label, config).events
+                actuation_start = time.perf_counter()
+                for kind, event_gesture in events.update(gesture_key, now):
+                    actuator.dispatch(hand_label, event_gesture, kind, config)
+                if events.active:
+                    boost_applied = actuator.dispatch(hand_label, events.active, "active", config)
+                    boost_applied_this_frame = boost_applied_this_frame or boost_applied
+                actuation_time += time.perf_counter() - actuation_start
+                overlay.left_text, overlay.right_text = get_labels(top_gesture_text, hand_label, finger_gesture_text, overlay.left_text, overlay.right_text)
+
+                if should_calculate_angle(top_gesture, finger_gesture_text) and hand_label == config.off_hand:
+                    degrees = calculate_pointer_angle(hands[i], hand_label)
                     if degrees is not None:
-                        update_mouse_movement(degrees, cfg.cursor_speed)
+                        actuation_start = time.perf_counter()
+                        pointer_active = actuator.move_cursor(degrees, config) or pointer_active
+                        actuation_time += time.perf_counter() - actuation_start
             except Exception:
                 print("Error while processing single hand:")
                 traceback.print_exc()
 
-        is_applied_boost(boost_applied_this_frame)
-        frame = draw_corner_labels(frame, w, left_corner_text, right_corner_text)
+        actuation_start = time.perf_counter()
+        for hand_label, kind, event_gesture in gesture_tracker.release_missing(hand_labels, now, config):
+            actuator.dispatch(hand_label, event_gesture, kind, config)
+        actuator.end_frame(pointer_active, boost_applied_this_frame, config)
+        actuation_time += time.perf_counter() - actuation_start
+
+        # The overlay is drawn on the debug capture thread, only on frames that are kept.
+        for path in debug_images:
+            debug_capture.submit_image(path, frame, overlay)
+        if config.debug_mode and config.debug_capture_mode == "ring":
+            debug_capture.add_frame(frame, overlay=overlay)
     except Exception:
         print("Error in process_hands:")
         traceback.print_exc()
 
-    return frame
\ No newline at end of file
+    pipeline_metrics.record("actuation", actuation_time)
+    pipeline_metrics.record("post_processing", time.perf_counter() - start_time - actuation_time)
+    return overlay
\ No newline at end of file
@@ -0,0 +1,161 @@
+import math
+import time
+import numpy as np
+from configuration.configuration import cfg
+from diagnostics_library.metrics import pipeline_metrics
+
+
+def _smoothing_factor(cutoff, dt):
+    tau = 1.0 / (2.0 * math.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class OneEuroFilter:
+    def __init__(self, min_cutoff=1.5, beta=5.0, d_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        self.x_prev = None
+        self.dx_prev = None
+        self.t_prev = None
+        self.cutoff = None
+
+    def __call__(self, x, t):
+        if self.x_prev is None or np.isnan(x).any():
+            self.reset()
+            if not np.isnan(x).any():
+                self.x_prev = x.copy()
+                self.dx_prev = np.zeros_like(x)
+                self.t_prev = t
+            return x
+
+        dt = max(t - self.t_prev, 1e-6)
+        dx = (x - self.x_prev) / dt
+        dx_hat = self.dx_prev + _smoothing_factor(self.d_cutoff, dt) * (dx - self.dx_prev)
+        # The cutoff rises with speed: heavy smoothing at rest, little lag on fast moves.
+        self.cutoff = self.min_cutoff + self.beta * np.abs(dx_hat)
+        alpha = 1.0 / (1.0 + 1.0 / (2.0 * math.pi * self.cutoff * dt))
+        x_hat = self.x_prev + alpha * (x - self.x_prev)
+
+        self.x_prev = x_hat
+        self.dx_prev = dx_hat
+        self.t_prev = t
+        return x_hat
+
+    def lag(self):
+        if self.cutoff is None:
+            return 0.0
+        return float(np.mean(1.0 / (2.0 * math.pi * self.cutoff)))
+
+
+class ConstantVelocityKalman:
+    def __init__(self, process_noise=50.0, measurement_noise=1e-5):
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.reset()
+
+    def reset(self):
+        self.position = None
+        self.t_prev = None
+        self.last_gain = None
+        self.last_dt = 0.0
+
+    def __call__(self, z, t):
+        if self.position is None or np.isnan(z).any():
+            self.reset()
+            if not np.isnan(z).any():
+                self.position = z.copy()
+                self.velocity = np.zeros_like(z)
+                self.p00 = np.full_like(z, self.measurement_noise)
+                self.p01 = np.zeros_like(z)
+                self.p11 = np.full_like(z, 1.0)
+                self.t_prev = t
+            return z
+
+        dt = max(t - self.t_prev, 1e-6)
+        q = self.process_noise
+
+        # Predict, every coordinate of every landmark is an independent [position, velocity] state.
+        self.position = self.position + self.velocity * dt
+        p00 = self.p00 + 2.0 * dt * self.p01 + dt * dt * self.p11 + q * dt ** 4 / 4.0
+        p01 = self.p01 + dt * self.p11 + q * dt ** 3 / 2.0
+        p11 = self.p11 + q * dt * dt
+
+        # Update.
+        s = p00 + self.measurement_noise
+        k0 = p00 / s
+        k1 = p01 / s
+        innovation = z - self.position
+        self.position = self.position + k0 * innovation
+        self.velocity = self.velocity + k1 * innovation
+        self.p00 = (1.0 - k0) * p00
+        self.p01 = (1.0 - k0) * p01
+        self.p11 = p11 - k1 * p01
+
+        self.t_prev = t
+        self.last_gain = k0
+        self.last_dt = dt
+        return self.position
+
+    def lag(self):
+        if self.last_gain is None:
+            return 0.0
+        gain = float(np.mean(self.last_gain))
+        return self.last_dt * (1.0 - gain) / max(gain, 1e-6)
+
+
+class LandmarkFilterBank:
+    def __init__(self, reset_after=0.5):
+        self.reset_after = reset_after
+        self.settings = None
+        self.filters = {}
+        self.last_seen = {}
+
+    def _create_filter(self, mode, config):
+        if mode == "kalman":
+            return ConstantVelocityKalman(config.kalman_process_noise, config.kalman_measurement_noise)
+        return OneEuroFilter(config.filter_min_cutoff, config.filter_beta, config.filter_d_cutoff)
+
+    def reset(self):
+        self.filters.clear()
+        self.last_seen.clear()
+
+    def apply(self, hands, hand_labels, now=None, config=cfg):
+        mode = config.landmark_filter
+        if mode not in ("one_euro", "kalman") or len(hand_labels) == 0:
+            return hands
+        settings = (
+            mode, config.filter_min_cutoff, config.filter_beta, config.filter_d_cutoff,
+            config.kalman_process_noise, config.kalman_measurement_noise,
+        )
+        if settings != self.settings:
+            self.settings = settings
+            self.reset()
+        if now is None:
+            now = time.monotonic()
+
+        start_time = time.perf_counter()
+        filtered = np.array(hands, dtype=np.float32, copy=True)
+        seen = {}
+        lags = []
+        for i, hand_label in enumerate(hand_labels):
+            key = (hand_label, seen.get(hand_label, 0))
+            seen[hand_label] = key[1] + 1
+
+            landmark_filter = self.filters.get(key)
+            if landmark_filter is None or now - self.last_seen.get(key, now) > self.reset_after:
+                landmark_filter = self._create_filter(mode, config)
+                self.filters[key] = landmark_filter
+            self.last_seen[key] = now
+            filtered[i] = landmark_filter(filtered[i].astype(np.float64), now)
+            lags.append(landmark_filter.lag())
+
+        pipeline_metrics.record("landmark_filter", time.perf_counter() - start_time)
+        pipeline_metrics.set_gauge("filter_lag_ms", round(1000.0 * sum(lags) / len(lags), 1))
+        return filtered
+
+
+landmark_filter_bank = LandmarkFilterBank()
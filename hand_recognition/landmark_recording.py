@@ -0,0 +1,261 @@
+import argparse
+import json
+import os
+import time
+from collections import namedtuple
+import numpy as np
+
+MAGIC = b"MNNLMK01"
+ALIGNMENT = 64
+NUM_LANDMARKS = 21
+HANDEDNESS_LABELS = ("Left", "Right", "Unknown")
+
+ReplayCategory = namedtuple("ReplayCategory", ["category_name", "score"])
+ReplayLandmark = namedtuple("ReplayLandmark", ["x", "y", "z"])
+
+
+class ReplayResult:
+    __slots__ = ("gestures", "handedness", "landmark_array", "_hand_landmarks")
+
+    def __init__(self, gestures, handedness, landmark_array):
+        self.gestures = gestures
+        self.handedness = handedness
+        self.landmark_array = landmark_array
+        self._hand_landmarks = None
+
+    @property
+    def hand_landmarks(self):
+        # Landmark objects are only needed for drawing, the gesture logic reads landmark_array.
+        if self._hand_landmarks is None:
+            self._hand_landmarks = [
+                [ReplayLandmark(float(x), float(y), float(z)) for x, y, z in hand]
+                for hand in self.landmark_array
+            ]
+        return self._hand_landmarks
+
+
+def _align(value):
+    return (value + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_columns(path, columns, meta):
+    header = dict(meta)
+    header["columns"] = {}
+    offset = 0
+    for name, array in columns.items():
+        header["columns"][name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset = _align(offset + array.nbytes)
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = _align(len(MAGIC) + 4 + len(header_bytes))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header_bytes).to_bytes(4, "little"))
+        f.write(header_bytes)
+        for name, array in columns.items():
+            f.seek(data_start + header["columns"][name]["offset"])
+            f.write(np.ascontiguousarray(array).tobytes())
+    os.replace(tmp_path, path)
+
+
+def read_columns(path):
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a landmark recording")
+        header_len = int.from_bytes(f.read(4), "little")
+        header = json.loads(f.read(header_len).decode("utf-8"))
+    data_start = _align(len(MAGIC) + 4 + header_len)
+
+    columns = {}
+    for name, spec in header.pop("columns").items():
+        shape = tuple(spec["shape"])
+        if int(np.prod(shape)) == 0:
+            columns[name] = np.zeros(shape, dtype=spec["dtype"])
+        else:
+            columns[name] = np.memmap(path, dtype=spec["dtype"], mode="r", offset=data_start + spec["offset"], shape=shape)
+    return columns, header
+
+
+class LandmarkRecorder:
+    def __init__(self, path, label=""):
+        self.path = path
+        # Every hand in a labelled session is a training example of that gesture.
+        self.label = label
+        self.gesture_names = []
+        self._gesture_index = {}
+        self._timestamps = []
+        self._hand_counts = []
+        self._landmarks = []
+        self._handedness = []
+        self._gesture_ids = []
+        self._gesture_scores = []
+
+    def _gesture_id(self, name):
+        if name not in self._gesture_index:
+            self._gesture_index[name] = len(self.gesture_names)
+            self.gesture_names.append(name)
+        return self._gesture_index[name]
+
+    def add_frame(self, timestamp, recognition_result):
+        gestures_list = (recognition_result.gestures or []) if recognition_result else []
+        handedness_list = (recognition_result.handedness or []) if recognition_result else []
+        landmarks_list = (recognition_result.hand_landmarks or []) if recognition_result else []
+        count = min(len(gestures_list), len(handedness_list), len(landmarks_list))
+
+        recorded = 0
+        for i in range(count):
+            hand = landmarks_list[i]
+            if len(hand) != NUM_LANDMARKS:
+                continue
+            self._landmarks.append(
+                np.array([(lm.x, lm.y, getattr(lm, "z", 0.0) or 0.0) for lm in hand], dtype=np.float32)
+            )
+            hand_label = handedness_list[i][0].category_name if handedness_list[i] else "Unknown"
+            self._handedness.append(HANDEDNESS_LABELS.index(hand_label) if hand_label in HANDEDNESS_LABELS else 2)
+            if gestures_list[i]:
+                top_gesture = gestures_list[i][0]
+                self._gesture_ids.append(self._gesture_id(top_gesture.category_name))
+                self._gesture_scores.append(top_gesture.score)
+            else:
+                self._gesture_ids.append(-1)
+                self._gesture_scores.append(0.0)
+            recorded += 1
+
+        self._timestamps.append(timestamp)
+        self._hand_counts.append(recorded)
+
+    def close(self):
+        if self._landmarks:
+            landmarks = np.stack(self._landmarks)
+        else:
+            landmarks = np.zeros((0, NUM_LANDMARKS, 3), dtype=np.float32)
+        columns = {
+            "timestamps": np.asarray(self._timestamps, dtype=np.float64),
+            "hand_offsets": np.concatenate(([0], np.cumsum(self._hand_counts, dtype=np.int64))).astype(np.int64),
+            "landmarks": landmarks,
+            "handedness": np.asarray(self._handedness, dtype=np.uint8),
+            "gesture_ids": np.asarray(self._gesture_ids, dtype=np.int16),
+            "gesture_scores": np.asarray(self._gesture_scores, dtype=np.float32),
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        write_columns(self.path, columns, {"version": 1, "gesture_names": self.gesture_names, "label": self.label})
+
+
+class LandmarkRecording:
+    def __init__(self, path):
+        self.path = path
+        columns, header = read_columns(path)
+        self.gesture_names = header.get("gesture_names", [])
+        self.label = header.get("label", "")
+        self.timestamps = columns["timestamps"]
+        self.hand_offsets = columns["hand_offsets"]
+        self.landmarks = columns["landmarks"]
+        self.handedness = columns["handedness"]
+        self.gesture_ids = columns["gesture_ids"]
+        self.gesture_scores = columns["gesture_scores"]
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def hand_slice(self, index):
+        return slice(int(self.hand_offsets[index]), int(self.hand_offsets[index + 1]))
+
+    def result(self, index):
+        hands = self.hand_slice(index)
+        gestures = []
+        handedness = []
+        for row in range(hands.start, hands.stop):
+            gesture_id = int(self.gesture_ids[row])
+            if gesture_id >= 0:
+                gestures.append([ReplayCategory(self.gesture_names[gesture_id], float(self.gesture_scores[row]))])
+            else:
+                gestures.append([])
+            handedness.append([ReplayCategory(HANDEDNESS_LABELS[self.handedness[row]], 1.0)])
+        return ReplayResult(gestures, handedness, np.asarray(self.landmarks[hands]))
+
+
+class LandmarkReplaySource:
+    def __init__(self, path, realtime=False):
+        self.recording = LandmarkRecording(path)
+        self.realtime = realtime
+
+    def __iter__(self):
+        start_time = time.monotonic()
+        first_timestamp = float(self.recording.timestamps[0]) if len(self.recording) else 0.0
+        for index in range(len(self.recording)):
+            timestamp = float(self.recording.timestamps[index])
+            if self.realtime:
+                delay = start_time + (timestamp - first_timestamp) - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            yield timestamp, self.recording.result(index)
+
+
+def create_session_recorder(directory="recordings", label=""):
+    filename = time.strftime("%Y%m%d_%H%M%S") + (f"_{label}" if label else "") + ".lmrec"
+    return LandmarkRecorder(os.path.join(directory, filename.replace(" ", "_")), label)
+
+
+def replay_gestures(source):
+    from hand_recognition.manual_hand_recognition import detect_finger_gestures
+    from hand_recognition.gesture_state import GestureTracker
+    from configuration.function_assigne.function_configuration import resolve_event_func_name
+
+    tracker = GestureTracker()
+    for timestamp, result in source:
+        hand_labels = [handedness[0].category_name for handedness in result.handedness]
+        states = tracker.classification_states(hand_labels)
+        finger_gestures = detect_finger_gestures(result.landmark_array, hand_labels, now=timestamp, states=states)
+        events = []
+        for gestures, hand_label, (finger_gesture_text, _) in zip(result.gestures, hand_labels, finger_gestures):
+            top_gesture = gestures[0] if gestures else None
+            gesture_key = finger_gesture_text or (top_gesture.category_name if top_gesture else "")
+            for kind, gesture in tracker.hand(hand_label).events.update(gesture_key, timestamp):
+                events.append((hand_label, kind, gesture, resolve_event_func_name(hand_label, gesture, kind)))
+        for hand_label, kind, gesture in tracker.release_missing(hand_labels, timestamp):
+            events.append((hand_label, kind, gesture, resolve_event_func_name(hand_label, gesture, kind)))
+        yield timestamp, events
+
+
+def replay_process_hands(source, width, height, actuate=False):
+    # Runs on the recorded clock with its own tracker and one config snapshot. Unless actuate is
+    # set the actions are only collected, yielded with every frame, and no input is sent.
+    from configuration.configuration import cfg
+    from hand_recognition.hand_processing import process_hands, DryRunActuator, live_actuator
+    from hand_recognition.gesture_state import GestureTracker
+
+    tracker = GestureTracker()
+    config = cfg.snapshot()
+    actuator = live_actuator if actuate else DryRunActuator()
+    blank = np.zeros((height, width, 3), dtype=np.uint8)
+    for timestamp, result in source:
+        overlay = process_hands(blank.copy(), result, tracker, config, now=timestamp, actuator=actuator)
+        yield timestamp, overlay, [] if actuate else actuator.take()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a landmark recording through the gesture logic.")
+    parser.add_argument("path")
+    parser.add_argument("--realtime", action="store_true", help="pace frames by their recorded timestamps")
+    parser.add_argument("--process-hands", action="store_true", help="run the full process_hands path, actions are printed")
+    parser.add_argument("--actuate", action="store_true", help="with --process-hands, send the actions as real input")
+    args = parser.parse_args()
+
+    source = LandmarkReplaySource(args.path, realtime=args.realtime)
+    frames = len(source.recording)
+    start = time.perf_counter()
+    if args.process_hands:
+        for timestamp, _, actions in replay_process_hands(source, 640, 480, args.actuate):
+            if actions:
+                print(f"{timestamp:10.3f} {actions}")
+    else:
+        for timestamp, events in replay_gestures(source):
+            if events:
+                print(f"{timestamp:10.3f} {events}")
+    elapsed = time.perf_counter() - start
+    print(f"Replayed {frames} frames in {elapsed:.3f}s ({frames / elapsed if elapsed > 0 else 0:.0f} fps)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,117 +1,128 @@
+from configuration.configuration import cfg
 from function_library.math_functions import calculate_distance
+from hand_recognition.gesture_state import GestureTracker
+from hand_recognition.gesture_classifier import classifier_loader
+import numpy as np
 import time
 
 _GESTURE_DEBOUNCE_SEC = 0.15
-_pointer_candidate_since = {}
-_two_fingers_candidate_since = {}
-
 _PINCH_DEBOUNCE_SEC = 0.08
-_pinch_candidate_since = {}
-_pinch_active_until = {}
 _PINCH_LOCK_SEC = 0.20
 
-def is_finger_open(tip, mcp, wrist, *, margin: float = 1.10, min_tip_mcp_dist: float = 0.035):
-    if tip is None or mcp is None or wrist is None:
-        return False
+# Only used by callers that do not pass their own per-hand states.
+_default_tracker = GestureTracker()
+
+WRIST = 0
+THUMB_TIP = 4
+INDEX_MCP = 5
+INDEX_TIP = 8
+FINGER_NAMES = ("Index", "Middle", "Ring", "Pinky")
+FINGER_TIPS = np.array([8, 12, 16, 20])
+FINGER_MCPS = np.array([5, 9, 13, 17])
+FINGER_MARGINS = np.array([1.10, 1.20, 1.10, 1.10], dtype=np.float32)
+FINGER_MIN_TIP_MCP_DIST = np.array([0.035, 0.050, 0.035, 0.035], dtype=np.float32)
+PINCH_MAX_DIST = 0.030
+
+def is_finger_open(tip, mcp, wrist, *, margin=1.10, min_tip_mcp_dist=0.035):
     dist_tip_wrist = calculate_distance(wrist, tip)
     dist_mcp_wrist = calculate_distance(wrist, mcp)
     dist_tip_mcp = calculate_distance(tip, mcp)
-    return (dist_tip_wrist > dist_mcp_wrist * margin) and (dist_tip_mcp > min_tip_mcp_dist)
+    return (dist_tip_wrist > dist_mcp_wrist * margin) & (dist_tip_mcp > min_tip_mcp_dist)
 
-def detect_finger_gesture(proto, hand_label):
-    try:
-        if len(proto.landmark) <= 12:
-            return "", False
-
-        wrist = proto.landmark[0]
-        thumb_tip = proto.landmark[4]
-        thumb_mcp = proto.landmark[2]
-        index_tip = proto.landmark[8]
-        index_mcp = proto.landmark[5]
-        middle_tip = proto.landmark[12]
-        middle_mcp = proto.landmark[9]
-        ring_tip = proto.landmark[16] if len(proto.landmark) > 16 else None
-        ring_mcp = proto.landmark[13] if len(proto.landmark) > 13 else None
-        pinky_tip = proto.landmark[20] if len(proto.landmark) > 20 else None
-        pinky_mcp = proto.landmark[17] if len(proto.landmark) > 17 else None
+def finger_features(hands):
+    # hands is a (hands x 21 x 3) array, every finger of every hand is evaluated at once.
+    wrist = hands[:, WRIST:WRIST + 1, :]
+    tips = hands[:, FINGER_TIPS, :]
+    mcps = hands[:, FINGER_MCPS, :]
+    open_mask = is_finger_open(tips, mcps, wrist, margin=FINGER_MARGINS, min_tip_mcp_dist=FINGER_MIN_TIP_MCP_DIST)
+    pinch_dists = calculate_distance(hands[:, THUMB_TIP:THUMB_TIP + 1, :], tips)
+    return open_mask, pinch_dists
 
+def detect_finger_gestures(hands, hand_labels, now=None, states=None, config=cfg):
+    if now is None:
         now = time.monotonic()
-        
-        index_open = is_finger_open(index_tip, index_mcp, wrist)
-        middle_open = is_finger_open(
-            middle_tip,
-            middle_mcp,
-            wrist,
-            margin=1.20,
-            min_tip_mcp_dist=0.050,
-        )
-        ring_open = is_finger_open(ring_tip, ring_mcp, wrist) if ring_tip and ring_mcp else False
-        pinky_open = is_finger_open(pinky_tip, pinky_mcp, wrist) if pinky_tip and pinky_mcp else False
-        
-        is_pointer = index_open and (not middle_open) and (not ring_open) and (not pinky_open)
-        is_victory = index_open and middle_open and (not ring_open) and (not pinky_open)
-        
-        allow_pinch = not (is_pointer or is_victory)
+    if len(hand_labels) == 0:
+        return []
+    if states is None:
+        states = _default_tracker.classification_states(hand_labels)
+
+    # gesture_classifier: "rules" (the thresholds below), "model" (a trained classifier only) or
+    # "both" (the classifier where it recognises a gesture, the rules otherwise).
+    predicted = None
+    if config.gesture_classifier != "rules":
+        classifier = classifier_loader.get(config.gesture_model_path)
+        if classifier is not None:
+            predicted = classifier.predict(hands, hand_labels, config.gesture_model_min_confidence)
+            if config.gesture_classifier == "model":
+                return [(name, False) for name, _ in predicted]
+    try:
+        open_mask, pinch_dists = finger_features(hands)
+        pinch_candidates = np.where(pinch_dists <= PINCH_MAX_DIST, pinch_dists, np.inf)
+        closest = np.argmin(pinch_candidates, axis=1)
+    except Exception:
+        return [("", False)] * len(hand_labels)
 
+    results = []
+    for i, hand_label in enumerate(hand_labels):
         pinch_label = None
-        pinch_dist = None
-        if allow_pinch and thumb_tip is not None:
-            pinch_pairs = [
-                ("Index", index_tip),
-                ("Middle", middle_tip),
-                ("Ring", ring_tip),
-                ("Pinky", pinky_tip),
-            ]
-
-            for name, tip in pinch_pairs:
-                if tip is None:
-                    continue
-                d = calculate_distance(thumb_tip, tip)
-                if d <= 0.030 and (pinch_dist is None or d < pinch_dist):
-                    pinch_dist = d
-                    pinch_label = f"Thumb+{name}"
-
-        if pinch_label is not None:
-            since = _pinch_candidate_since.get(hand_label)
-            if since is None:
-                _pinch_candidate_since[hand_label] = now
-            elif (now - since) >= _PINCH_DEBOUNCE_SEC:
-                _pinch_active_until[hand_label] = now + _PINCH_LOCK_SEC
-                _pointer_candidate_since.pop(hand_label, None)
-                _two_fingers_candidate_since.pop(hand_label, None)
-                return pinch_label, False
-        else:
-            _pinch_candidate_since.pop(hand_label, None)
-
-        if _pinch_active_until.get(hand_label, 0.0) > now:
-            return "", False
-
-        two_fingers_candidate = index_open and middle_open and (not ring_open) and (not pinky_open)
-        if two_fingers_candidate:
-            _pointer_candidate_since.pop(hand_label, None)
-            since = _two_fingers_candidate_since.get(hand_label)
-            if since is None:
-                _two_fingers_candidate_since[hand_label] = now
-            elif (now - since) >= _GESTURE_DEBOUNCE_SEC:
-                return are_2_fingers_up_or_down(index_tip.y, index_mcp.y), False
-        else:
-            _two_fingers_candidate_since.pop(hand_label, None)
-
-        pointer_candidate = index_open and (not middle_open) and (not ring_open) and (not pinky_open)
-        if pointer_candidate:
-            since = _pointer_candidate_since.get(hand_label)
-            if since is None:
-                _pointer_candidate_since[hand_label] = now
-            elif (now - since) >= _GESTURE_DEBOUNCE_SEC:
-                return "pointer", False
-        else:
-            _pointer_candidate_since.pop(hand_label, None)
-        return "", False
+        if np.isfinite(pinch_candidates[i, closest[i]]):
+            pinch_label = f"Thumb+{FINGER_NAMES[closest[i]]}"
+        index_up = hands[i, INDEX_TIP, 1] < hands[i, INDEX_MCP, 1]
+        results.append(_classify_hand(states[i], open_mask[i], pinch_label, index_up, now))
+    if predicted is not None:
+        results = [(name, False) if name else rule for (name, _), rule in zip(predicted, results)]
+    return results
+
+def detect_finger_gesture(landmarks, hand_label, now=None, state=None):
+    try:
+        hands = np.asarray(landmarks, dtype=np.float32).reshape(1, 21, 3)
     except Exception:
         return "", False
-    
-def are_2_fingers_up_or_down(index_tip, index_mcp):
-    if index_tip < index_mcp:
+    return detect_finger_gestures(hands, [hand_label], now, None if state is None else [state])[0]
+
+def _classify_hand(state, open_mask, pinch_label, index_up, now):
+    index_open, middle_open, ring_open, pinky_open = (bool(v) for v in open_mask)
+
+    is_pointer = index_open and (not middle_open) and (not ring_open) and (not pinky_open)
+    is_victory = index_open and middle_open and (not ring_open) and (not pinky_open)
+
+    if is_pointer or is_victory:
+        pinch_label = None
+
+    if pinch_label is not None:
+        if state.pinch_candidate_since is None:
+            state.pinch_candidate_since = now
+        elif (now - state.pinch_candidate_since) >= _PINCH_DEBOUNCE_SEC:
+            state.pinch_active_until = now + _PINCH_LOCK_SEC
+            state.pointer_candidate_since = None
+            state.two_fingers_candidate_since = None
+            return pinch_label, False
+    else:
+        state.pinch_candidate_since = None
+
+    if state.pinch_active_until > now:
+        return "", False
+
+    if is_victory:
+        state.pointer_candidate_since = None
+        if state.two_fingers_candidate_since is None:
+            state.two_fingers_candidate_since = now
+        elif (now - state.two_fingers_candidate_since) >= _GESTURE_DEBOUNCE_SEC:
+            return are_2_fingers_up_or_down(index_up), False
+    else:
+        state.two_fingers_candidate_since = None
+
+    if is_pointer:
+        if state.pointer_candidate_since is None:
+            state.pointer_candidate_since = now
+        elif (now - state.pointer_candidate_since) >= _GESTURE_DEBOUNCE_SEC:
+            return "pointer", False
+    else:
+        state.pointer_candidate_since = None
+    return "", False
+
+def are_2_fingers_up_or_down(index_up):
+    if index_up:
         return "2 fingers: Up"
     else:
         return "2 fingers: Down"
@@ -1,4 +1,7 @@
+# Imported first so the startup report measures from launch.
+from diagnostics_library.startup_timing import startup_timer
 from front_end.UI import runAPP
 
 if __name__ == "__main__":
-    runAPP()
\ No newline at end of file
+    startup_timer.mark("main started")
+    runAPP()